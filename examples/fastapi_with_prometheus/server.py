@@ -2,26 +2,19 @@ import asyncio
 import contextlib
 import time
 from typing import AsyncGenerator
+from monitored_ioloop.exporters.prometheus import LoopMetricsPrometheusCollector
 from monitored_ioloop.monitored_asyncio import monitored_asyncio_loop_factory
-from monitored_ioloop.monitoring import IoLoopMonitorState
+from monitored_ioloop.monitoring import LoopMetricsCollector
 from monitored_ioloop.helpers.fastapi import (
     MonitoredIOLoopMiddleware,
 )
 from fastapi import FastAPI
-from prometheus_client import start_http_server, Histogram
+from prometheus_client import REGISTRY, start_http_server
 
-slow_callbacks_wall_time_histogram = Histogram(
-    "slow_callbacks_wall_time_histogram",
-    "Histogram of the slow callbacks (coroutines) that are blocking the loop",
-    labelnames=["callback_name"],
-    buckets=[0.000001, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1, 2, 4],
-)
-
-loop_lag_time_histogram = Histogram(
-    "loop_lag_time_histogram",
-    "Histogram of the loop lag time",
-    buckets=[0.000001, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1, 2, 4],
-)
+# The loop only records into in-process histograms,
+# they are converted to Prometheus histograms when /metrics is scraped.
+metrics_collector = LoopMetricsCollector()
+REGISTRY.register(LoopMetricsPrometheusCollector(metrics_collector, top_k=20))
 
 
 @contextlib.asynccontextmanager
@@ -51,14 +44,4 @@ async def blocking_slow(sleep_for: int) -> str:
     return f"slept for {sleep_for} seconds"
 
 
-def monitor_ioloop_callback(ioloop_monitor_state: IoLoopMonitorState) -> None:
-    loop_lag_time_histogram.observe(ioloop_monitor_state.loop_lag)
-    callback_wall_time = ioloop_monitor_state.callback_wall_time
-    callback_pretty_name = ioloop_monitor_state.callback_pretty_name
-    if callback_wall_time > 0.5:
-        slow_callbacks_wall_time_histogram.labels(callback_pretty_name).observe(
-            callback_wall_time
-        )
-
-
-loop_factory = monitored_asyncio_loop_factory(monitor_ioloop_callback)
+loop_factory = monitored_asyncio_loop_factory(None, metrics_collector=metrics_collector)
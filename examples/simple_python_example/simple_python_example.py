@@ -48,6 +48,8 @@ if __name__ == "__main__":
         format="%(asctime)s %(message)s",
     )
     logger.info("starting")
-    loop_factory = monitored_asyncio_loop_factory(monitor_callback=monitor)
+    loop_factory = monitored_asyncio_loop_factory(
+        monitor_callback=monitor, slow_callback_threshold=0.1, loop_lag_threshold=0.1
+    )
     logger.info("Created loop factory")
     asyncio.run(main(), loop_factory=loop_factory)
@@ -0,0 +1,334 @@
+"""
+Offline analysis of the events recorded by a LoopEventRecorder (see monitored_ioloop.recorder).
+
+Usage:
+    python -m monitored_ioloop.analyze /var/log/loop-events --window 60 --lag-threshold 0.1
+"""
+
+from monitored_ioloop.exceptions import NoNumpyInstalled
+
+try:
+    import numpy
+# pragma: no cover
+except ImportError:
+    # pragma: no cover
+    raise NoNumpyInstalled() from None
+
+import argparse
+import datetime
+import os
+import typing
+from dataclasses import dataclass, field
+
+from monitored_ioloop.recorder import iter_events, read_names
+
+QUANTILES = (0.5, 0.99)
+
+
+@dataclass
+class CallbackSummary:
+    """
+    The totals of the recorded events of a single callback name, weighted by their sample rate.
+    """
+
+    name: str
+    count: int
+    total_wall_time: float
+    max_wall_time: float
+
+
+@dataclass
+class LagWindow:
+    """
+    The loop lag of the events that finished in the window starting at started_at (a time.time() timestamp).
+    """
+
+    started_at: float
+    count: int
+    p50_loop_lag: float
+    p99_loop_lag: float
+    max_loop_lag: float
+
+
+@dataclass
+class SpikeCulprit:
+    """
+    A callback that ran right before callbacks with a loop lag above the threshold,
+    spikes is the amount of such callbacks it preceded and wall_time its wall time summed over them.
+    """
+
+    name: str
+    spikes: int
+    wall_time: float
+
+
+@dataclass
+class TraceAnalysis:
+    events_count: int
+    spikes_count: int
+    callbacks: typing.List[CallbackSummary] = field(default_factory=list)
+    lag_windows: typing.List[LagWindow] = field(default_factory=list)
+    spike_culprits: typing.List[SpikeCulprit] = field(default_factory=list)
+
+
+def _weighted_quantiles(
+    values: "numpy.ndarray[typing.Any, typing.Any]",
+    weights: "numpy.ndarray[typing.Any, typing.Any]",
+    quantiles: typing.Sequence[float],
+) -> typing.List[float]:
+    """
+    The smallest value whose cumulative weight reaches the quantile's rank, like LogLinearHistogram.percentile.
+    """
+    order = numpy.argsort(values, kind="stable")
+    cumulative_weights = numpy.cumsum(weights[order])
+    ranks = numpy.asarray(quantiles) * cumulative_weights[-1]
+    indices = numpy.minimum(
+        numpy.searchsorted(cumulative_weights, ranks), len(values) - 1
+    )
+    return [float(value) for value in values[order][indices]]
+
+
+class _LagWindows:
+    """
+    Aggregates the loop lag into windows of window seconds. The events are recorded in the order they finished,
+    so a window is complete once an event of a later window is seen, and only one window is kept in memory.
+    """
+
+    def __init__(self, window: float):
+        self._window = window
+        self._window_id: typing.Optional[int] = None
+        self._lags: typing.List["numpy.ndarray[typing.Any, typing.Any]"] = []
+        self._weights: typing.List["numpy.ndarray[typing.Any, typing.Any]"] = []
+        self.windows: typing.List[LagWindow] = []
+
+    def add(self, chunk: "numpy.ndarray[typing.Any, typing.Any]") -> None:
+        finished_at = chunk["timestamp"] + chunk["wall_time"]
+        window_ids = numpy.floor(finished_at / self._window).astype(numpy.int64)
+        boundaries = numpy.flatnonzero(numpy.diff(window_ids)) + 1
+        for start, end in zip(
+            numpy.concatenate(([0], boundaries)),
+            numpy.concatenate((boundaries, [len(chunk)])),
+        ):
+            window_id = int(window_ids[start])
+            if window_id != self._window_id:
+                self.flush()
+                self._window_id = window_id
+            self._lags.append(chunk["loop_lag"][start:end])
+            self._weights.append(chunk["sample_rate"][start:end])
+
+    def flush(self) -> None:
+        if self._window_id is None:
+            return
+        lags = numpy.concatenate(self._lags)
+        weights = numpy.concatenate(self._weights)
+        p50, p99 = _weighted_quantiles(lags, weights, QUANTILES)
+        self.windows.append(
+            LagWindow(
+                started_at=self._window_id * self._window,
+                count=int(weights.sum()),
+                p50_loop_lag=p50,
+                p99_loop_lag=p99,
+                max_loop_lag=float(lags.max()),
+            )
+        )
+        self._window_id = None
+        self._lags = []
+        self._weights = []
+
+
+def analyze_trace(
+    directory: str,
+    window: float = 60.0,
+    lag_threshold: float = 0.1,
+    preceding: int = 3,
+    chunk_size: int = 1_000_000,
+) -> TraceAnalysis:
+    """
+    Analyze a recording in a single streaming pass, chunk_size events at a time:
+    * callbacks - the totals per callback name, sorted by total wall time.
+    * lag_windows - the loop lag percentiles per window of window seconds (by the time the events finished).
+    * spike_culprits - the callbacks among the preceding recorded events of every event whose loop lag is at least
+      lag_threshold, sorted by the amount of spikes they preceded. Their wall time is what delayed the spike,
+      when only slow callbacks are recorded (see slow_callback_threshold) the preceding events are the slow ones.
+
+    The recording can be analyzed while it is still being written, the events recorded after the analysis started
+    may be left out.
+    """
+    names = read_names(directory)
+    names_count = len(names)
+    counts = numpy.zeros(names_count, dtype=numpy.int64)
+    total_wall_times = numpy.zeros(names_count)
+    max_wall_times = numpy.zeros(names_count)
+    culprit_spikes = numpy.zeros(names_count, dtype=numpy.int64)
+    culprit_wall_times = numpy.zeros(names_count)
+    lag_windows = _LagWindows(window)
+    events_count = spikes_count = 0
+    # The last events of the previous chunk, for the spikes at the start of a chunk.
+    tail_name_ids = numpy.empty(0, dtype=numpy.uint32)
+    tail_wall_times = numpy.empty(0)
+
+    for chunk in iter_events(directory, chunk_size):
+        if chunk["name_id"].max() >= names_count:
+            # Names interned after the names were read, the recorder is still recording.
+            chunk = chunk[chunk["name_id"] < names_count]
+            if not len(chunk):
+                continue
+        name_ids = chunk["name_id"]
+        wall_times = chunk["wall_time"]
+        sample_rates = chunk["sample_rate"]
+        events_count += int(sample_rates.sum())
+        counts += numpy.bincount(
+            name_ids, weights=sample_rates, minlength=names_count
+        ).astype(numpy.int64)
+        total_wall_times += numpy.bincount(
+            name_ids, weights=wall_times * sample_rates, minlength=names_count
+        )
+        numpy.maximum.at(max_wall_times, name_ids, wall_times)
+        lag_windows.add(chunk)
+
+        spikes = numpy.flatnonzero(chunk["loop_lag"] >= lag_threshold)
+        spikes_count += len(spikes)
+        if preceding and len(spikes):
+            extended_name_ids = numpy.concatenate((tail_name_ids, name_ids))
+            extended_wall_times = numpy.concatenate((tail_wall_times, wall_times))
+            spikes += len(tail_name_ids)
+            for distance in range(1, preceding + 1):
+                culprits = spikes - distance
+                culprits = culprits[culprits >= 0]
+                culprit_spikes += numpy.bincount(
+                    extended_name_ids[culprits], minlength=names_count
+                )
+                culprit_wall_times += numpy.bincount(
+                    extended_name_ids[culprits],
+                    weights=extended_wall_times[culprits],
+                    minlength=names_count,
+                )
+        if preceding:
+            tail_name_ids = numpy.concatenate((tail_name_ids, name_ids))[-preceding:]
+            tail_wall_times = numpy.concatenate((tail_wall_times, wall_times))[
+                -preceding:
+            ]
+    lag_windows.flush()
+
+    recorded = numpy.flatnonzero(counts)
+    return TraceAnalysis(
+        events_count=events_count,
+        spikes_count=spikes_count,
+        callbacks=[
+            CallbackSummary(
+                name=names[name_id],
+                count=int(counts[name_id]),
+                total_wall_time=float(total_wall_times[name_id]),
+                max_wall_time=float(max_wall_times[name_id]),
+            )
+            for name_id in recorded[numpy.argsort(-total_wall_times[recorded])]
+        ],
+        lag_windows=lag_windows.windows,
+        spike_culprits=[
+            SpikeCulprit(
+                name=names[name_id],
+                spikes=int(culprit_spikes[name_id]),
+                wall_time=float(culprit_wall_times[name_id]),
+            )
+            for name_id in sorted(
+                numpy.flatnonzero(culprit_spikes),
+                key=lambda name_id: (
+                    -culprit_spikes[name_id],
+                    -culprit_wall_times[name_id],
+                ),
+            )
+        ],
+    )
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat(
+        sep=" ", timespec="seconds"
+    )
+
+
+def format_analysis(analysis: TraceAnalysis, top: int = 10) -> str:
+    lines = [
+        f"Events: {analysis.events_count}, loop lag spikes: {analysis.spikes_count}",
+        "",
+        f"Top {top} callbacks by total wall time:",
+        f"{'total (s)':>12}{'max (s)':>12}{'count':>12}  name",
+    ]
+    for callback in analysis.callbacks[:top]:
+        lines.append(
+            f"{callback.total_wall_time:>12.4f}{callback.max_wall_time:>12.4f}"
+            f"{callback.count:>12}  {callback.name}"
+        )
+    lines += [
+        "",
+        f"Top {top} callbacks by max wall time:",
+        f"{'max (s)':>12}{'total (s)':>12}{'count':>12}  name",
+    ]
+    for callback in sorted(
+        analysis.callbacks, key=lambda callback: callback.max_wall_time, reverse=True
+    )[:top]:
+        lines.append(
+            f"{callback.max_wall_time:>12.4f}{callback.total_wall_time:>12.4f}"
+            f"{callback.count:>12}  {callback.name}"
+        )
+    lines += [
+        "",
+        "Loop lag per window:",
+        f"{'window start':<22}{'count':>12}{'p50 (s)':>12}{'p99 (s)':>12}{'max (s)':>12}",
+    ]
+    for lag_window in analysis.lag_windows:
+        lines.append(
+            f"{_format_time(lag_window.started_at):<22}{lag_window.count:>12}"
+            f"{lag_window.p50_loop_lag:>12.4f}{lag_window.p99_loop_lag:>12.4f}"
+            f"{lag_window.max_loop_lag:>12.4f}"
+        )
+    lines += [
+        "",
+        f"Top {top} callbacks preceding loop lag spikes:",
+        f"{'spikes':>12}{'wall (s)':>12}  name",
+    ]
+    for culprit in analysis.spike_culprits[:top]:
+        lines.append(f"{culprit.spikes:>12}{culprit.wall_time:>12.4f}  {culprit.name}")
+    return "\n".join(lines)
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m monitored_ioloop.analyze",
+        description="Summarize the loop events recorded by a LoopEventRecorder.",
+    )
+    parser.add_argument("directory", help="The LoopEventRecorder's directory")
+    parser.add_argument(
+        "--window", type=float, default=60.0, help="Loop lag window, in seconds"
+    )
+    parser.add_argument(
+        "--lag-threshold",
+        type=float,
+        default=0.1,
+        help="Loop lag (in seconds) from which an event is a spike",
+    )
+    parser.add_argument(
+        "--preceding",
+        type=int,
+        default=3,
+        help="Amount of events before a spike that are counted as its culprits",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Callbacks to list")
+    parser.add_argument(
+        "--chunk-size", type=int, default=1_000_000, help="Events read at a time"
+    )
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+    analysis = analyze_trace(
+        args.directory,
+        window=args.window,
+        lag_threshold=args.lag_threshold,
+        preceding=args.preceding,
+        chunk_size=args.chunk_size,
+    )
+    print(format_analysis(analysis, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import contextlib
+import typing
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from monitored_ioloop.monitoring import (
+    LoopMetricsCollector,
+    LoopTimeAccount,
+    _loop_time_account,
+)
+
+_cost_label: ContextVar[typing.Optional[str]] = ContextVar(
+    "monitored_ioloop_cost_label", default=None
+)
+
+
+def current_cost_label() -> typing.Optional[str]:
+    return _cost_label.get()
+
+
+@contextlib.contextmanager
+def cost_label(label: str) -> typing.Iterator[None]:
+    """
+    Charge the loop time of everything scheduled in the current context to the label.
+    Tasks copy the context they are created in, so the label propagates to child tasks (for example asyncio.gather)
+    and callbacks, as long as they are created inside the block.
+
+    Usage:
+    >>> with cost_label("[GET] /users/{user_id}"):
+    ...     await handle_request()
+    """
+    token = _cost_label.set(label)
+    try:
+        yield
+    finally:
+        _cost_label.reset(token)
+
+
+@contextlib.contextmanager
+def loop_time_account() -> typing.Iterator[LoopTimeAccount]:
+    """
+    Charge the wall time of every callback that runs in the current context (and the tasks created inside the block)
+    to a new LoopTimeAccount. The loop only charges accounts when its account_loop_time is set,
+    LoopLagMiddleware sets it.
+    """
+    account = LoopTimeAccount()
+    token = _loop_time_account.set(account)
+    try:
+        yield account
+    finally:
+        _loop_time_account.reset(token)
+
+
+@dataclass
+class LoopCostRow:
+    """
+    The loop cost charged to a single label.
+    """
+
+    label: str
+
+    """
+    The total wall time of the callbacks charged to the label, its cost on the loop.
+    """
+    total_wall_time: float
+
+    """
+    The amount of callbacks (steps) charged to the label.
+    """
+    steps: int
+
+    """
+    The 99th percentile of the wall time of a single step.
+    """
+    p99_step_wall_time: float
+
+    """
+    The 99th percentile of the loop lag of the steps, how long they waited for the busy loop.
+    """
+    p99_loop_lag: float
+
+
+class LoopCostTable:
+    """
+    Aggregates the wall time and loop lag of every callback by the cost label of the context it was scheduled in
+    (see cost_label). Pass it to the monitored loops with the cost_table option, MonitoredIOLoopMiddleware
+    labels every request with its route, so rows() tells which endpoints are eating the loop,
+    even when their work fans out to other tasks.
+
+    Charging happens on the loop thread and costs a context variable lookup per callback,
+    rows() can be called from any thread.
+
+    Usage:
+    >>> cost_table = LoopCostTable()
+    >>> factory = monitored_asyncio_loop_factory(None, cost_table=cost_table)
+    >>> ...
+    >>> for row in cost_table.rows(reset=True):
+    ...     print(row.label, row.total_wall_time, row.p99_step_wall_time)
+    """
+
+    WALL_TIME = "wall_time"
+    LOOP_LAG = "loop_lag"
+
+    def __init__(self, sub_buckets: int = 8):
+        self._collector = LoopMetricsCollector(sub_buckets)
+
+    def charge_current_context(self, wall_time: float, loop_lag: float) -> None:
+        """
+        Charge a callback to the current context's cost label, if there is one.
+        Must be called from the loop thread, in the callback's context.
+        """
+        label = _cost_label.get()
+        if label is None:
+            return
+        self._collector.observe(self.WALL_TIME, label, wall_time)
+        self._collector.observe(self.LOOP_LAG, label, loop_lag)
+
+    def rows(self, reset: bool = False) -> typing.List[LoopCostRow]:
+        """
+        The cost per label, the most expensive first.
+        """
+        histograms = self._collector.snapshot(reset).histograms
+        loop_lags = histograms.get(self.LOOP_LAG, {})
+        rows = [
+            LoopCostRow(
+                label=label,
+                total_wall_time=wall_times.sum,
+                steps=wall_times.count,
+                p99_step_wall_time=wall_times.percentile(0.99),
+                p99_loop_lag=loop_lags[label].percentile(0.99)
+                if label in loop_lags
+                else 0.0,
+            )
+            for label, wall_times in histograms.get(self.WALL_TIME, {}).items()
+        ]
+        rows.sort(key=lambda row: row.total_wall_time, reverse=True)
+        return rows
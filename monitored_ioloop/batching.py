@@ -0,0 +1,104 @@
+import threading
+import typing
+from logging import getLogger
+
+from monitored_ioloop.monitoring import IoLoopMonitorState
+
+logger = getLogger(__name__)
+
+
+class BatchedMonitorCallback:
+    """
+    A monitor callback that moves the exporting work off the event loop thread.
+    The loop thread only appends the IoLoopMonitorState to a preallocated bounded ring buffer,
+    a background thread drains it every flush_interval seconds and calls batch_callback with the batch.
+    When the buffer is full new events are dropped and counted in dropped_count,
+    so a slow exporter can never add lag to the loop it is measuring.
+
+    The ring buffer is single producer, use one instance per monitored loop.
+    The buffered states don't keep the callbacks alive: their callback_pretty_name is set to their cheap
+    callback_name before they are buffered, so the loop thread doesn't pay for formatting the handles.
+    When resolve_pretty_names is set the pretty name is resolved on the loop thread instead (formatting a handle,
+    for example a Task repr, per buffered state), so it describes the callback as it ran.
+
+    Usage:
+    >>> batched_callback = BatchedMonitorCallback(lambda states: print(len(states)))
+    >>> factory = monitored_asyncio_loop_factory(batched_callback)
+    >>> asyncio.run(main(), loop_factory=factory)
+    >>> batched_callback.close()
+    """
+
+    def __init__(
+        self,
+        batch_callback: typing.Callable[[typing.Sequence[IoLoopMonitorState]], None],
+        capacity: int = 4096,
+        flush_interval: float = 0.1,
+        resolve_pretty_names: bool = False,
+    ):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive.")
+        self._batch_callback = batch_callback
+        self._capacity = capacity
+        self._flush_interval = flush_interval
+        self._resolve_pretty_names = resolve_pretty_names
+        self._buffer: typing.List[typing.Optional[IoLoopMonitorState]] = [
+            None
+        ] * capacity
+        # The write index is only advanced by the loop thread and the read index only by the
+        # draining thread, so the buffer needs no lock.
+        self._write_index = 0
+        self._read_index = 0
+        self.dropped_count = 0
+        self._closed = threading.Event()
+        self._drain_thread = threading.Thread(
+            target=self._drain_periodically,
+            name="monitored-ioloop-batched-callback",
+            daemon=True,
+        )
+        self._drain_thread.start()
+
+    def __call__(self, ioloop_state: IoLoopMonitorState) -> None:
+        write_index = self._write_index
+        if write_index - self._read_index >= self._capacity:
+            self.dropped_count += 1
+            return
+        if self._resolve_pretty_names:
+            # Reading the lazy name resolves it.
+            ioloop_state.callback_pretty_name
+        else:
+            ioloop_state.set_callback_pretty_name(ioloop_state.callback_name)
+        self._buffer[write_index % self._capacity] = ioloop_state
+        self._write_index = write_index + 1
+
+    def _drain(self) -> None:
+        read_index, write_index = self._read_index, self._write_index
+        if read_index == write_index:
+            return
+        batch: typing.List[IoLoopMonitorState] = []
+        for index in range(read_index, write_index):
+            slot = index % self._capacity
+            batch.append(typing.cast(IoLoopMonitorState, self._buffer[slot]))
+            self._buffer[slot] = None
+        self._read_index = write_index
+        try:
+            self._batch_callback(batch)
+        except Exception:
+            logger.warning("Batch callback failed.", exc_info=True)
+
+    def _drain_periodically(self) -> None:
+        while not self._closed.wait(self._flush_interval):
+            self._drain()
+        self._drain()
+
+    def close(self, timeout: typing.Optional[float] = None) -> None:
+        """
+        Stop the background thread, delivering the events that are still buffered.
+        """
+        self._closed.set()
+        self._drain_thread.join(timeout)
+
+    def __enter__(self) -> "BatchedMonitorCallback":
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        self.close()
@@ -3,3 +3,24 @@ class NoUvLoopInstalled(ImportError):
         super().__init__(
             "Please install uvloop compatible version via `pip install monitored_ioloop[uvloop]`"
         )
+
+
+class NoPrometheusClientInstalled(ImportError):
+    def __init__(self) -> None:
+        super().__init__(
+            "Please install prometheus_client compatible version via `pip install monitored_ioloop[prometheus]`"
+        )
+
+
+class NoOpenTelemetryInstalled(ImportError):
+    def __init__(self) -> None:
+        super().__init__(
+            "Please install opentelemetry-api compatible version via `pip install monitored_ioloop[opentelemetry]`"
+        )
+
+
+class NoNumpyInstalled(ImportError):
+    def __init__(self) -> None:
+        super().__init__(
+            "Please install numpy compatible version via `pip install monitored_ioloop[numpy]`"
+        )
@@ -0,0 +1,45 @@
+import typing
+
+from monitored_ioloop.histogram import LogLinearHistogram
+
+OTHER_NAME = "other"
+
+
+class TopKNames:
+    """
+    Bounds the amount of names (callback or request names) an exporter exports per metric.
+    Names keep their series once exported, the free slots go to the names with the most samples,
+    and the rest are merged into a single "other" histogram.
+
+    Not thread safe, an exporter should use it from its collecting thread only.
+    """
+
+    def __init__(self, top_k: int):
+        self._top_k = top_k
+        self._exported_names: typing.Dict[str, typing.Set[str]] = {}
+
+    def bound(
+        self, metric: str, by_name: typing.Dict[str, LogLinearHistogram]
+    ) -> typing.Dict[str, LogLinearHistogram]:
+        exported_names = self._exported_names.setdefault(metric, set())
+        candidates = sorted(
+            (name for name in by_name if name not in exported_names),
+            key=lambda name: by_name[name].count,
+            reverse=True,
+        )
+        for name in candidates[: max(self._top_k - len(exported_names), 0)]:
+            exported_names.add(name)
+
+        bounded: typing.Dict[str, LogLinearHistogram] = {}
+        other: typing.Optional[LogLinearHistogram] = None
+        for name, histogram in by_name.items():
+            if name in exported_names and name != OTHER_NAME:
+                bounded[name] = histogram
+                continue
+            if other is None:
+                other = histogram.copy()
+            else:
+                other.merge(histogram)
+        if other is not None:
+            bounded[OTHER_NAME] = other
+        return bounded
@@ -0,0 +1,206 @@
+import collections
+import json
+import os
+import threading
+import time
+import typing
+from logging import getLogger
+
+from monitored_ioloop.monitoring import IoLoopMonitorState
+
+logger = getLogger(__name__)
+
+LOOP_LAG_EVENT_NAME = "loop lag"
+
+# A reported callback, copied on the loop thread: the thread id, the callback's name,
+# the time it started (time.perf_counter()), its wall time, loop lag, the loop handles count and sample rate.
+_TraceEvent = typing.Tuple[int, str, float, float, float, int, int]
+
+
+class ChromeTraceWriter:
+    """
+    A monitor callback writing the reported callbacks as a Chrome Trace Event file, that can be opened in
+    Perfetto (https://ui.perfetto.dev) or chrome://tracing to view the loop's activity as a timeline.
+
+    Every callback is a complete ("X") event on the track of the thread running its loop, named by its callback_name
+    (the pretty name would cost a repr per event, and once the callback returned it describes, for example, a done Task).
+    A callback whose loop lag is at least lag_threshold also gets an async slice, from the time it was scheduled
+    until it started running, so stalls show up as the lag piling up behind them.
+
+    The loop thread only copies the event's fields into a bounded queue (so the queued events don't keep the callbacks
+    alive), a background thread serializes the queued events and writes them to the file every flush_interval seconds.
+    When capacity events are queued new events are dropped and counted in dropped_count.
+    A single writer can be shared by several loops (in different threads), each loop gets its own track.
+
+    The file is a JSON array that is only closed on close, the trace viewers load unclosed files as well.
+
+    Usage:
+    >>> with ChromeTraceWriter("loop.trace.json") as trace_writer:
+    >>>     asyncio.run(main(), loop_factory=monitored_asyncio_loop_factory(trace_writer))
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.1,
+        lag_threshold: float = 0.001,
+        capacity: int = 100_000,
+    ):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive.")
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._first_event = True
+        self._flush_interval = flush_interval
+        self._lag_threshold = lag_threshold
+        self._capacity = capacity
+        # deque.append and popleft are atomic, so the loop threads never take a lock.
+        self._events: typing.Deque[_TraceEvent] = collections.deque()
+        self.dropped_count = 0
+        self._thread_names: typing.Dict[int, str] = {}
+        self._named_threads: typing.Set[int] = set()
+        self._pid = os.getpid()
+        # Timestamps are relative to the writer's creation, in microseconds.
+        self._started_at = time.perf_counter()
+        self._lag_slices_count = 0
+        # Held while writing to the file, by the writer thread and by flush.
+        self._write_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._writer_thread = threading.Thread(
+            target=self._write_periodically,
+            name="monitored-ioloop-chrome-trace",
+            daemon=True,
+        )
+        self._writer_thread.start()
+
+    def __call__(self, ioloop_state: IoLoopMonitorState) -> None:
+        if self._closed.is_set():
+            return
+        if len(self._events) >= self._capacity:
+            self.dropped_count += 1
+            return
+        thread_id = threading.get_ident()
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = threading.current_thread().name
+        self._events.append(
+            (
+                thread_id,
+                ioloop_state.callback_name,
+                ioloop_state.callback_started_at,
+                ioloop_state.callback_wall_time,
+                ioloop_state.loop_lag,
+                ioloop_state.loop_handles_count,
+                ioloop_state.sample_rate,
+            )
+        )
+
+    def _trace_events(
+        self, event: _TraceEvent
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        (
+            thread_id,
+            callback_name,
+            callback_started_at,
+            wall_time,
+            loop_lag,
+            handles_count,
+            sample_rate,
+        ) = event
+        trace_events: typing.List[typing.Dict[str, typing.Any]] = []
+        if thread_id not in self._named_threads:
+            self._named_threads.add(thread_id)
+            trace_events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": thread_id,
+                    "args": {"name": self._thread_names[thread_id]},
+                }
+            )
+        started_at = (callback_started_at - self._started_at) * 1e6
+        trace_events.append(
+            {
+                "name": callback_name,
+                "cat": "callback",
+                "ph": "X",
+                "ts": started_at,
+                "dur": wall_time * 1e6,
+                "pid": self._pid,
+                "tid": thread_id,
+                "args": {
+                    "loop_lag": loop_lag,
+                    "loop_handles_count": handles_count,
+                    "sample_rate": sample_rate,
+                },
+            }
+        )
+        if loop_lag >= self._lag_threshold:
+            self._lag_slices_count += 1
+            lag_slice = {
+                "name": LOOP_LAG_EVENT_NAME,
+                "cat": "loop_lag",
+                "id": self._lag_slices_count,
+                "pid": self._pid,
+                "tid": thread_id,
+            }
+            trace_events += [
+                {
+                    **lag_slice,
+                    "ph": "b",
+                    "ts": started_at - loop_lag * 1e6,
+                    "args": {"callback": callback_name},
+                },
+                {**lag_slice, "ph": "e", "ts": started_at},
+            ]
+        return trace_events
+
+    def _write_pending(self) -> None:
+        """
+        Write the queued events to the file, must be called with the write lock held.
+        """
+        if self._file.closed or not self._events:
+            return
+        lines = []
+        for _ in range(len(self._events)):
+            lines += [
+                json.dumps(trace_event)
+                for trace_event in self._trace_events(self._events.popleft())
+            ]
+        separator = "" if self._first_event else ",\n"
+        self._first_event = False
+        self._file.write(separator + ",\n".join(lines))
+
+    def _write_periodically(self) -> None:
+        while not self._closed.wait(self._flush_interval):
+            try:
+                with self._write_lock:
+                    self._write_pending()
+            except Exception:
+                logger.warning("Writing the trace events failed.", exc_info=True)
+        with self._write_lock:
+            self._write_pending()
+            self._file.write("\n]\n")
+            self._file.close()
+
+    def flush(self) -> None:
+        """
+        Write the queued events to the file.
+        """
+        with self._write_lock:
+            self._write_pending()
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self, timeout: typing.Optional[float] = None) -> None:
+        """
+        Stop the writer thread, writing the queued events and closing the JSON array.
+        """
+        self._closed.set()
+        self._writer_thread.join(timeout)
+
+    def __enter__(self) -> "ChromeTraceWriter":
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        self.close()
@@ -0,0 +1,189 @@
+from monitored_ioloop.exceptions import NoOpenTelemetryInstalled
+
+try:
+    from opentelemetry import metrics, trace
+    from opentelemetry.metrics import CallbackOptions, Meter, Observation
+# pragma: no cover
+except ImportError:
+    # pragma: no cover
+    raise NoOpenTelemetryInstalled() from None
+
+import functools
+import threading
+import typing
+import weakref
+from asyncio import AbstractEventLoop
+
+from monitored_ioloop.exporters.cardinality import TopKNames
+from monitored_ioloop.histogram import LogLinearHistogram
+from monitored_ioloop.monitoring import (
+    IoLoopInnerState,
+    IoLoopMonitorState,
+    LoopMetricsCollector,
+    LoopMetricsSnapshot,
+)
+
+DEFAULT_METRICS = (
+    LoopMetricsCollector.CALLBACK_WALL_TIME,
+    LoopMetricsCollector.LOOP_LAG,
+    LoopMetricsCollector.CROSS_THREAD_LATENCY,
+    LoopMetricsCollector.TICK_POLL_TIME,
+    LoopMetricsCollector.TICK_DURATION,
+    LoopMetricsCollector.TICK_CALLBACKS_RUN,
+    LoopMetricsCollector.PROBE_LAG,
+    LoopMetricsCollector.REQUEST_QUEUEING_DELAY,
+    LoopMetricsCollector.REQUEST_LOOP_TIME,
+)
+
+SLOW_CALLBACK_EVENT_NAME = "slow loop callback"
+
+_COUNT_METRICS = {LoopMetricsCollector.TICK_CALLBACKS_RUN}
+
+
+class LoopMetricsInstruments:
+    """
+    Registers OpenTelemetry observable instruments reading a LoopMetricsCollector's histograms.
+    The loop thread only records into the in-process histograms, the instruments' callbacks run when the
+    metric reader collects (on the reader's thread), so no OpenTelemetry code runs on the loop's hot path.
+
+    Every metric is exported as two observable counters with a "name" attribute (the callback or request name):
+    "<prefix>.<metric>" with the sum of the recorded values and "<prefix>.<metric>.count" with their amount,
+    their rates give the average wall time / lag per name. Like LoopMetricsPrometheusCollector,
+    each metric exports at most top_k names and merges the rest into an "other" series.
+    The loops added with observe_loop report their handles count in the "<prefix>.handles" observable gauge.
+
+    The counters are cumulative, so the LoopMetricsCollector must not be snapshot with reset.
+
+    Usage:
+    >>> collector = LoopMetricsCollector()
+    >>> instruments = LoopMetricsInstruments(collector)
+    >>> factory = monitored_asyncio_loop_factory(None, metrics_collector=collector)
+    """
+
+    def __init__(
+        self,
+        metrics_collector: LoopMetricsCollector,
+        meter: typing.Optional[Meter] = None,
+        prefix: str = "monitored_ioloop",
+        top_k: int = 20,
+        exported_metrics: typing.Sequence[str] = DEFAULT_METRICS,
+    ):
+        self._metrics_collector = metrics_collector
+        self._top_k_names = TopKNames(top_k)
+        self._loop_states: "weakref.WeakValueDictionary[str, IoLoopInnerState]" = (
+            weakref.WeakValueDictionary()
+        )
+        # All the instruments are read from a single snapshot per collection,
+        # a new snapshot is taken once an instrument is read a second time.
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: typing.Optional[LoopMetricsSnapshot] = None
+        self._instruments_read: typing.Set[str] = set()
+
+        meter = meter or metrics.get_meter("monitored_ioloop")
+        for metric in exported_metrics:
+            meter.create_observable_counter(
+                f"{prefix}.{metric}",
+                callbacks=[functools.partial(self._observe_sum, metric)],
+                unit="1" if metric in _COUNT_METRICS else "s",
+                description=f"Sum of the monitored_ioloop {metric}",
+            )
+            meter.create_observable_counter(
+                f"{prefix}.{metric}.count",
+                callbacks=[functools.partial(self._observe_count, metric)],
+                unit="1",
+                description=f"Amount of the monitored_ioloop {metric} values",
+            )
+        meter.create_observable_gauge(
+            f"{prefix}.handles",
+            callbacks=[self._observe_handles],
+            unit="1",
+            description="Amount of handles in the monitored loops",
+        )
+
+    def observe_loop(
+        self, loop: AbstractEventLoop, name: str = LoopMetricsCollector.LOOP_NAME
+    ) -> None:
+        """
+        Report the loop's handles count under the given "loop" attribute,
+        the loop is held weakly and stops being reported once it is garbage collected.
+        """
+        ioloop_state: typing.Optional[IoLoopInnerState] = getattr(
+            loop, "ioloop_state", None
+        )
+        if ioloop_state is None:
+            raise ValueError(f"{loop!r} is not a monitored loop.")
+        self._loop_states[name] = ioloop_state
+
+    def _bounded_histograms(
+        self, instrument: str, metric: str
+    ) -> typing.Dict[str, LogLinearHistogram]:
+        with self._snapshot_lock:
+            if self._snapshot is None or instrument in self._instruments_read:
+                self._snapshot = self._metrics_collector.snapshot()
+                self._instruments_read.clear()
+            self._instruments_read.add(instrument)
+            by_name = self._snapshot.histograms.get(metric)
+            if not by_name:
+                return {}
+            return self._top_k_names.bound(metric, by_name)
+
+    def _observe_sum(
+        self, metric: str, _options: CallbackOptions
+    ) -> typing.Iterable[Observation]:
+        return [
+            Observation(histogram.sum, {"name": name})
+            for name, histogram in self._bounded_histograms(
+                f"{metric}.sum", metric
+            ).items()
+        ]
+
+    def _observe_count(
+        self, metric: str, _options: CallbackOptions
+    ) -> typing.Iterable[Observation]:
+        return [
+            Observation(histogram.count, {"name": name})
+            for name, histogram in self._bounded_histograms(
+                f"{metric}.count", metric
+            ).items()
+        ]
+
+    def _observe_handles(
+        self, _options: CallbackOptions
+    ) -> typing.Iterable[Observation]:
+        return [
+            Observation(ioloop_state.handles_count, {"loop": name})
+            for name, ioloop_state in list(self._loop_states.items())
+        ]
+
+
+class SlowCallbackSpanEvents:
+    """
+    A monitor callback adding a "slow loop callback" event to the active span when a callback's
+    wall time is above threshold. The monitor callback runs in the slow callback's context,
+    so the event is added to the span that was current while the callback ran (for a Task step,
+    the innermost span the coroutine had open when it yielded back to the loop).
+
+    Resolving the callback_pretty_name only happens for slow callbacks on a recording span.
+
+    Usage:
+    >>> factory = monitored_asyncio_loop_factory(SlowCallbackSpanEvents(threshold=0.1))
+    """
+
+    def __init__(self, threshold: float = 0.1):
+        self._threshold = threshold
+
+    def __call__(self, ioloop_state: IoLoopMonitorState) -> None:
+        if ioloop_state.callback_wall_time < self._threshold:
+            return
+        span = trace.get_current_span()
+        if not span.is_recording():
+            return
+        span.add_event(
+            SLOW_CALLBACK_EVENT_NAME,
+            attributes={
+                "monitored_ioloop.callback": ioloop_state.callback_pretty_name,
+                "monitored_ioloop.callback_wall_time": ioloop_state.callback_wall_time,
+                "monitored_ioloop.loop_lag": ioloop_state.loop_lag,
+                "monitored_ioloop.handles_count": ioloop_state.loop_handles_count,
+            },
+        )
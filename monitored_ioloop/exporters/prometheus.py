@@ -0,0 +1,89 @@
+from monitored_ioloop.exceptions import NoPrometheusClientInstalled
+
+try:
+    from prometheus_client.core import HistogramMetricFamily
+    from prometheus_client.registry import Collector
+# pragma: no cover
+except ImportError:
+    # pragma: no cover
+    raise NoPrometheusClientInstalled() from None
+
+import typing
+
+from monitored_ioloop.exporters.cardinality import TopKNames
+from monitored_ioloop.monitoring import LoopMetricsCollector
+
+DEFAULT_TIME_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+)
+DEFAULT_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_COUNT_METRICS = {LoopMetricsCollector.TICK_CALLBACKS_RUN}
+
+
+class LoopMetricsPrometheusCollector(Collector):
+    """
+    A Prometheus collector exporting a LoopMetricsCollector's histograms.
+    The loop thread only records into the in-process histograms, the histograms are copied and re-bucketed into
+    Prometheus buckets on the scraping thread, so no exporter code (or lock) runs on the loop's hot path.
+
+    Every metric is exported as a "<prefix>_<metric>_seconds" histogram with a "name" label (the callback
+    or request name). To bound the label cardinality, each metric exports at most top_k names:
+    names keep their series once exported, the free slots go to the names with the most samples,
+    and the rest are merged into a single "other" series.
+
+    Prometheus histograms are cumulative, so the exported LoopMetricsCollector must not be snapshot with reset.
+
+    Usage:
+    >>> collector = LoopMetricsCollector()
+    >>> prometheus_client.REGISTRY.register(LoopMetricsPrometheusCollector(collector))
+    >>> factory = monitored_asyncio_loop_factory(None, metrics_collector=collector)
+    """
+
+    def __init__(
+        self,
+        metrics_collector: LoopMetricsCollector,
+        prefix: str = "monitored_ioloop",
+        top_k: int = 20,
+        time_buckets: typing.Sequence[float] = DEFAULT_TIME_BUCKETS,
+        count_buckets: typing.Sequence[float] = DEFAULT_COUNT_BUCKETS,
+    ):
+        self._metrics_collector = metrics_collector
+        self._prefix = prefix
+        self._time_buckets = sorted(time_buckets)
+        self._count_buckets = sorted(count_buckets)
+        self._top_k_names = TopKNames(top_k)
+
+    def collect(self) -> typing.Iterator[HistogramMetricFamily]:
+        snapshot = self._metrics_collector.snapshot()
+        for metric, by_name in sorted(snapshot.histograms.items()):
+            if metric in _COUNT_METRICS:
+                metric_name, buckets = f"{self._prefix}_{metric}", self._count_buckets
+            else:
+                metric_name = f"{self._prefix}_{metric}_seconds"
+                buckets = self._time_buckets
+            family = HistogramMetricFamily(
+                metric_name, f"monitored_ioloop {metric}", labels=["name"]
+            )
+            for name, histogram in self._top_k_names.bound(metric, by_name).items():
+                cumulative_counts = histogram.cumulative_counts(buckets)
+                family.add_metric(
+                    [name],
+                    [
+                        (str(bound), count)
+                        for bound, count in zip(buckets, cumulative_counts)
+                    ]
+                    + [("+Inf", histogram.count)],
+                    histogram.sum,
+                )
+            yield family
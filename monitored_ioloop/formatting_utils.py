@@ -24,3 +24,27 @@ def pretty_callback_name(callback: typing.Callable[..., typing.Any]) -> str:
         )
     else:
         return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+def aggregation_callback_name(callback: typing.Callable[..., typing.Any]) -> str:
+    """
+    A cheap, bounded cardinality name for the callback, used as a key when aggregating metrics.
+    Unlike the pretty names it never uses repr, so it doesn't contain ids or addresses.
+    Tasks are named by their name if it was set (for example by MonitoredIOLoopMiddleware),
+    otherwise by their coroutine.
+    """
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, tasks.Task):
+        return aggregation_task_name(owner)
+    return getattr(callback, "__qualname__", None) or type(callback).__qualname__
+
+
+def aggregation_task_name(task: "tasks.Task[typing.Any]") -> str:
+    """
+    The task's name if it was set, otherwise the qualified name of its coroutine.
+    """
+    task_name = task.get_name()
+    if not task_name.startswith("Task-"):
+        return task_name
+    coroutine = task.get_coro()
+    return getattr(coroutine, "__qualname__", None) or type(coroutine).__qualname__
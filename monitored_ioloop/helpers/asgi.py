@@ -0,0 +1,98 @@
+import asyncio
+import time
+import typing
+
+from monitored_ioloop.attribution import loop_time_account
+from monitored_ioloop.monitoring import IoLoopInnerState, LoopMetricsCollector
+
+Scope = typing.MutableMapping[str, typing.Any]
+Message = typing.MutableMapping[str, typing.Any]
+Receive = typing.Callable[[], typing.Awaitable[Message]]
+Send = typing.Callable[[Message], typing.Awaitable[None]]
+ASGIApp = typing.Callable[[Scope, Receive, Send], typing.Awaitable[None]]
+
+UNMATCHED_ROUTE_NAME = "<unmatched route>"
+
+
+def default_request_name(scope: Scope) -> str:
+    """
+    The HTTP method and the path template of the route that served the request, when the framework
+    reports it in the scope (Starlette and FastAPI set scope["route"]), so the names have a bounded cardinality.
+    """
+    route_path = getattr(scope.get("route"), "path", None)
+    return f"[{scope['method']}] {route_path or UNMATCHED_ROUTE_NAME}"
+
+
+class LoopLagMiddleware:
+    """
+    A pure ASGI middleware (for any ASGI framework, or a raw ASGI app) that records for every HTTP request:
+    * request_queueing_delay - How long the request waited for the busy loop before its first step ran,
+      the loop lag of the step that called the middleware.
+    * request_loop_time - The wall time the request's callbacks (including the tasks it created) spent
+      on the loop until the response started.
+
+    Both are recorded into the metrics collector, keyed by request_name(scope) which is evaluated
+    when the response starts, so tail HTTP latency can be correlated with loop saturation.
+    The middleware needs the app to run on a monitored loop, on other loops nothing is recorded.
+    It enables the loop's account_loop_time and track_current_callback on the lifespan startup (or on the loop's
+    first request, that can't be recorded since its first step started before it was tracked), create the loop
+    with track_current_callback=True when the server doesn't run the lifespan protocol.
+
+    Usage:
+    >>> collector = LoopMetricsCollector()
+    >>> app = LoopLagMiddleware(app, collector)
+    >>> server = uvicorn.Server(uvicorn.Config(app, loop="none"))
+    >>> asyncio.run(server.serve(), loop_factory=monitored_uvloop_loop_factory(None))
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        metrics_collector: LoopMetricsCollector,
+        request_name: typing.Callable[[Scope], str] = default_request_name,
+    ):
+        self.app = app
+        self._metrics_collector = metrics_collector
+        self._request_name = request_name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        ioloop_state: typing.Optional[IoLoopInnerState] = getattr(
+            asyncio.get_running_loop(), "ioloop_state", None
+        )
+        if scope["type"] not in ("http", "lifespan") or ioloop_state is None:
+            await self.app(scope, receive, send)
+            return
+
+        tracked = ioloop_state.track_current_callback
+        ioloop_state.account_loop_time = ioloop_state.track_current_callback = True
+        if scope["type"] != "http" or not tracked:
+            await self.app(scope, receive, send)
+            return
+
+        queueing_delay = ioloop_state.current_callback_loop_lag
+        response_started = False
+
+        with loop_time_account() as account:
+
+            async def send_with_recording(message: Message) -> None:
+                nonlocal response_started
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    # The current step isn't charged to the account until it returns.
+                    current_step_time = (
+                        time.perf_counter() - ioloop_state.current_callback_started_at
+                    )
+                    name = self._request_name(scope)
+                    self._metrics_collector.observe(
+                        LoopMetricsCollector.REQUEST_QUEUEING_DELAY,
+                        name,
+                        queueing_delay,
+                    )
+                    self._metrics_collector.observe(
+                        LoopMetricsCollector.REQUEST_LOOP_TIME,
+                        name,
+                        account.wall_time + current_step_time,
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_with_recording)
@@ -1,8 +1,13 @@
 import asyncio
+import typing
 
+from starlette.routing import BaseRoute, Match
 from starlette.types import ASGIApp, Receive, Scope, Send
 from typing import Protocol
 
+from monitored_ioloop.attribution import cost_label
+from monitored_ioloop.helpers.asgi import UNMATCHED_ROUTE_NAME
+
 
 class AsgiMiddlewareType(Protocol):
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None: ...
@@ -19,31 +24,94 @@ def mask_numeric_segments(path: str) -> str:
 
 def default_callback_pretty_name(scope: Scope) -> str:
     """
-    Default callback_pretty_name for FastAPI helper middleware.
+    callback_pretty_name for requests that are not served by a Starlette router.
     """
     masked_path = mask_numeric_segments(scope["path"])
     return f"[{scope['method']}] {masked_path}"
 
 
+def route_template(scope: Scope) -> typing.Optional[str]:
+    """
+    The path template of the Starlette route that fully matches the request, for example "/users/{user_id}".
+    Mounted routers are followed, so their templates include the mount path.
+    None if the app has no router or no route matches.
+    """
+    router = getattr(scope.get("app"), "router", None)
+    if router is None:
+        return None
+    return _match_route_template(router.routes, scope)
+
+
+def _match_route_template(
+    routes: typing.Sequence[BaseRoute], scope: Scope
+) -> typing.Optional[str]:
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match != Match.FULL:
+            continue
+        template: str = getattr(route, "path", "")
+        child_routes = getattr(route, "routes", None)
+        if child_routes:
+            child_template = _match_route_template(
+                child_routes, {**scope, **child_scope}
+            )
+            if child_template is None:
+                continue
+            template += child_template
+        return template
+    return None
+
+
 class MonitoredIOLoopMiddleware:
     """
     This feature requires you to have installed fastapi BY YOURSELF.
     monitored_ioloop DOES NOT REQUIRE fastapi as a dependency.
     In order to allow a more useful callback_pretty_name when using starlette based frameworks (for example FastAPI),
-    this middleware will set the current task name to the HTTP method and path.
-    For example when a GET request is made to /ping, the current task name will be set to "[GET] /ping".
+    this middleware will set the current task name to the HTTP method and the template of the matched route.
+    For example when a GET request is made to /users/1234, the current task name will be set to
+    "[GET] /users/{user_id}". The names have a bounded cardinality, which matters when they are used as metric labels.
+    The middleware runs before the router, so naming a request matches it against the routes. The names are cached
+    per method and path, so repeated paths (health checks, collections, hot items) only cost a dict lookup,
+    the first request of every path (for example every new id) still pays for the matching.
+    Requests that match no route are named "<unmatched route>".
+    The same name is set as the request's cost label (see monitored_ioloop.attribution), so a LoopCostTable
+    charges the request's callbacks to it, including the ones of tasks it spawns.
     """
 
+    # Bounds the cache, the paths are unbounded (they contain ids), the oldest path is evicted first.
+    MAX_CACHED_NAMES = 1024
+
     def __init__(self, app: ASGIApp):
         self.app = app
+        self._route_names: typing.Dict[typing.Tuple[str, str, str], str] = {}
+
+    def _callback_pretty_name(self, scope: Scope) -> str:
+        if getattr(scope.get("app"), "router", None) is None:
+            return default_callback_pretty_name(scope)
+        key = (scope["method"], scope.get("root_path", ""), scope["path"])
+        name = self._route_names.get(key)
+        if name is not None:
+            return name
+        template = route_template(scope)
+        name = (
+            UNMATCHED_ROUTE_NAME
+            if template is None
+            else f"[{scope['method']}] {template}"
+        )
+        if len(self._route_names) >= self.MAX_CACHED_NAMES:
+            del self._route_names[next(iter(self._route_names))]
+        self._route_names[key] = name
+        return name
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
 
+        callback_pretty_name = self._callback_pretty_name(scope)
         current_task = asyncio.current_task()
         if current_task is not None:
-            current_task.set_name(default_callback_pretty_name(scope))
+            current_task.set_name(callback_pretty_name)
 
-        await self.app(scope, receive, send)
+        with cost_label(callback_pretty_name):
+            await self.app(scope, receive, send)
@@ -0,0 +1,126 @@
+import math
+import typing
+
+
+class LogLinearHistogram:
+    """
+    A HDR style log-linear histogram.
+    Every power of two range is split into sub_buckets linear buckets, so the relative error
+    of a percentile is bounded by 1 / sub_buckets while recording a value stays a frexp and a dict update.
+
+    The histogram is not thread safe, it is meant to be written from the loop thread only.
+    Readers on other threads should work on a copy (see LoopMetricsCollector.snapshot).
+
+    Usage:
+    >>> histogram = LogLinearHistogram()
+    >>> histogram.record(0.002)
+    >>> histogram.percentile(0.99)
+    """
+
+    __slots__ = ("sub_buckets", "counts", "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, sub_buckets: int = 8):
+        self.sub_buckets = sub_buckets
+        self.counts: typing.Dict[int, int] = {}
+        # Values that are zero or negative (for example because of a coarse clock)
+        # don't have a logarithmic bucket, and are counted here instead.
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float, count: int = 1) -> None:
+        """
+        Record the value count times, a count above 1 is used for sampled values.
+        """
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zero_count += count
+            return
+        mantissa, exponent = math.frexp(value)
+        index = exponent * self.sub_buckets + int(
+            (mantissa - 0.5) * 2 * self.sub_buckets
+        )
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def bucket_upper_bound(self, index: int) -> float:
+        exponent, sub_bucket = divmod(index, self.sub_buckets)
+        return math.ldexp(0.5 + (sub_bucket + 1) / (2 * self.sub_buckets), exponent)
+
+    def buckets(self) -> typing.List[typing.Tuple[float, int]]:
+        """
+        The non empty buckets as (upper bound, count) pairs sorted by the upper bound,
+        values that are zero or negative are reported in a bucket with an upper bound of 0.
+        """
+        buckets = [
+            (self.bucket_upper_bound(index), count)
+            for index, count in sorted(self.counts.items())
+        ]
+        if self.zero_count:
+            buckets.insert(0, (0.0, self.zero_count))
+        return buckets
+
+    def cumulative_counts(
+        self, upper_bounds: typing.Sequence[float]
+    ) -> typing.List[int]:
+        """
+        Re-bucket the histogram into fixed buckets (for example Prometheus' "le" buckets):
+        for every upper bound (sorted ascending), the amount of values in the buckets whose upper bound is not above it.
+        A bucket that straddles a bound is counted in the next one, so counts are never overestimated.
+        """
+        cumulative_counts = []
+        buckets = self.buckets()
+        seen = bucket_index = 0
+        for upper_bound in upper_bounds:
+            while (
+                bucket_index < len(buckets) and buckets[bucket_index][0] <= upper_bound
+            ):
+                seen += buckets[bucket_index][1]
+                bucket_index += 1
+            cumulative_counts.append(seen)
+        return cumulative_counts
+
+    def percentile(self, quantile: float) -> float:
+        """
+        The upper bound of the bucket containing the given quantile (0 <= quantile <= 1),
+        clamped to the recorded min and max. Returns 0 for an empty histogram.
+        """
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        seen = 0
+        for upper_bound, count in self.buckets():
+            seen += count
+            if seen >= rank:
+                return max(self.min, min(upper_bound, self.max))
+        return self.max
+
+    def merge(self, other: "LogLinearHistogram") -> None:
+        if other.sub_buckets != self.sub_buckets:
+            raise ValueError("Can't merge histograms with different sub_buckets.")
+        # Copying the items first keeps merging from another thread safe
+        # while the loop thread keeps recording into `other`.
+        for index, count in list(other.counts.items()):
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> "LogLinearHistogram":
+        histogram = LogLinearHistogram(self.sub_buckets)
+        histogram.merge(self)
+        return histogram
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(count={self.count}, sum={self.sum}, "
+            f"p50={self.percentile(0.5)}, p99={self.percentile(0.99)}, max={self.max})"
+        )
@@ -1,14 +1,23 @@
 import asyncio
+import collections
+import selectors
+import time
 import typing
 import warnings
-from asyncio import Handle
+from logging import getLogger
+from asyncio import Handle, TimerHandle
 
 from monitored_ioloop.monitored_ioloop_base import BaseMonitoredEventLoopPolicy
 from monitored_ioloop.monitoring import (
     wrap_callback_with_monitoring,
     IoLoopMonitorState,
     IoLoopInnerState,
+    IoLoopTickState,
+    MonitoringOptions,
+    split_monitoring_options,
 )
+from monitored_ioloop.registry import loop_registry
+from monitored_ioloop.utilization import LoopUtilization
 
 if typing.TYPE_CHECKING:
     from mypy_extensions import VarArg
@@ -20,17 +29,145 @@ else:
 
 _Ts = typing.TypeVarTuple("_Ts")
 
+logger = getLogger(__name__)
+
+
+class _TimedSelector:
+    """
+    Forwards everything to the loop's selector, and sums up the time spent blocked in select().
+    """
+
+    def __init__(self, selector: selectors.BaseSelector):
+        self._selector = selector
+        self.poll_time = 0.0
+        self.poll_started_at: typing.Optional[float] = None
+
+    def select(
+        self, timeout: typing.Optional[float] = None
+    ) -> typing.List[typing.Tuple[selectors.SelectorKey, int]]:
+        self.poll_started_at = start = time.perf_counter()
+        try:
+            return self._selector.select(timeout)
+        finally:
+            self.poll_time += time.perf_counter() - start
+            self.poll_started_at = None
+
+    def poll_time_until(self, now: float) -> float:
+        """
+        The total time spent in select() until now, including a select() that is still blocking.
+        """
+        poll_started_at = self.poll_started_at
+        if poll_started_at is None:
+            return self.poll_time
+        return self.poll_time + now - poll_started_at
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._selector, name)
+
+
+class _CountingDeque(collections.deque):  # type: ignore[type-arg]
+    """
+    The loop's ready queue, counting the handles the loop took out of it to run.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.popped_count = 0
+
+    def popleft(self) -> typing.Any:
+        self.popped_count += 1
+        return super().popleft()
+
+
+class SelectorEventLoopOptions(MonitoringOptions, total=False):
+    """
+    MonitoringOptions, and the keyword arguments of asyncio.SelectorEventLoop.
+    """
+
+    selector: selectors.BaseSelector
+
 
 class MonitoredSelectorEventLoop(asyncio.SelectorEventLoop):
     def __init__(
         self,
-        monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+        monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
         *args: typing.Any,
-        **kwargs: typing.Any,
+        tick_monitor_callback: typing.Optional[
+            typing.Callable[[IoLoopTickState], None]
+        ] = None,
+        **options: typing.Unpack[SelectorEventLoopOptions],
     ):
-        super().__init__(*args, **kwargs)
+        """
+        tick_monitor_callback, when given, is called with an IoLoopTickState after every loop iteration.
+        Tick statistics are also aggregated into the metrics_collector when there is one.
+        The options that aren't MonitoringOptions (selector) are passed to asyncio.SelectorEventLoop.
+        """
+        monitoring_options, loop_kwargs = split_monitoring_options(options)
+        super().__init__(*args, **loop_kwargs)
         self._monitor_callback = monitor_callback
-        self._state = IoLoopInnerState(handles_count=0)
+        self._tick_monitor_callback = tick_monitor_callback
+        self._state = IoLoopInnerState(handles_count=0, **monitoring_options)
+        self._state.loop_id = loop_registry.register(self)
+        self._monitor_ticks = (
+            tick_monitor_callback is not None
+            or self._state.metrics_collector is not None
+        )
+        # The private selector is swapped for a timed one, to measure the poll (idle) time,
+        # and when ticks are monitored the ready queue for one that counts the handles every tick runs.
+        self._timed_selector = _TimedSelector(self._selector)  # type: ignore[has-type]
+        self._selector = self._timed_selector
+        if self._monitor_ticks:
+            self._ready = _CountingDeque()
+
+    def run_forever(self) -> None:
+        self._state.start_running()
+        try:
+            super().run_forever()
+        finally:
+            self._state.stop_running()
+
+    @property
+    def ioloop_state(self) -> IoLoopInnerState:
+        """
+        The loop's monitoring state, for helpers that need the state of the current callback.
+        """
+        return self._state
+
+    def loop_utilization(self) -> LoopUtilization:
+        """
+        The loop's cumulative idle (blocked in the selector) and active time, can be called from any thread.
+        """
+        now = time.perf_counter()
+        running_time = self._state.running_time_until(now)
+        idle_time = min(self._timed_selector.poll_time_until(now), running_time)
+        return LoopUtilization(
+            idle_time=idle_time, active_time=running_time - idle_time
+        )
+
+    def _run_once(self) -> None:
+        if not self._monitor_ticks:
+            super()._run_once()  # type: ignore[misc]
+            return
+
+        ready_count = len(self._ready)
+        popped_count_before = self._ready.popped_count
+        poll_time_before = self._timed_selector.poll_time
+        start = time.perf_counter()
+        super()._run_once()  # type: ignore[misc]
+        tick_state = IoLoopTickState(
+            poll_time=self._timed_selector.poll_time - poll_time_before,
+            ready_count=ready_count,
+            callbacks_run=self._ready.popped_count - popped_count_before,
+            tick_duration=time.perf_counter() - start,
+        )
+
+        if self._state.metrics_collector is not None:
+            self._state.metrics_collector.record_tick(tick_state)
+        if self._tick_monitor_callback is not None:
+            try:
+                self._tick_monitor_callback(tick_state)
+            except Exception:
+                logger.warning("Tick monitor callback failed.", exc_info=True)
 
     def call_soon(
         self,
@@ -46,6 +183,36 @@ class MonitoredSelectorEventLoop(asyncio.SelectorEventLoop):
         callback_with_monitoring.set_handle(handle)
         return handle
 
+    def call_soon_threadsafe(
+        self,
+        callback: typing.Callable[[VarArg(*_Ts)], object],
+        *args: *_Ts,
+        **kwargs: typing.Any,
+    ) -> Handle:
+        callback_with_monitoring = wrap_callback_with_monitoring(
+            callback, self._monitor_callback, self._state, thread_safe=True
+        )
+
+        handle = super().call_soon_threadsafe(callback_with_monitoring, *args, **kwargs)
+        callback_with_monitoring.set_handle(handle)
+        return handle
+
+    def call_at(
+        self,
+        when: float,
+        callback: typing.Callable[[VarArg(*_Ts)], object],
+        *args: *_Ts,
+        **kwargs: typing.Any,
+    ) -> TimerHandle:
+        # call_later is implemented on top of call_at.
+        callback_with_monitoring = wrap_callback_with_monitoring(
+            callback, self._monitor_callback, self._state, timer_when=when
+        )
+
+        handle = super().call_at(when, callback_with_monitoring, *args, **kwargs)
+        callback_with_monitoring.set_handle(handle)
+        return handle
+
 
 class MonitoredAsyncIOEventLoopPolicy(BaseMonitoredEventLoopPolicy):
     """Event loop policy.
@@ -62,22 +229,38 @@ class MonitoredAsyncIOEventLoopPolicy(BaseMonitoredEventLoopPolicy):
     >>> asyncio.get_event_loop()
     """
 
-    def __init__(self, monitor_callback: typing.Callable[[IoLoopMonitorState], None]):
+    def __init__(
+        self,
+        monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
+        tick_monitor_callback: typing.Optional[
+            typing.Callable[[IoLoopTickState], None]
+        ] = None,
+        **monitoring_options: typing.Unpack[MonitoringOptions],
+    ):
         warnings.warn(
             "MonitoredAsyncIOEventLoopPolicy is deprecated. "
             "Use monitored_uvloop_loop_factory() instead.",
             DeprecationWarning,
             stacklevel=2,
         )
-        super().__init__(monitor_callback)
+        super().__init__(monitor_callback, **monitoring_options)
+        self._tick_monitor_callback = tick_monitor_callback
 
     def _loop_factory(self) -> MonitoredSelectorEventLoop:
-        loop = MonitoredSelectorEventLoop(self._monitor_callback)
+        loop = MonitoredSelectorEventLoop(
+            self._monitor_callback,
+            tick_monitor_callback=self._tick_monitor_callback,
+            **self._monitoring_options,
+        )
         return loop
 
 
 def monitored_asyncio_loop_factory(
-    monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+    monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
+    tick_monitor_callback: typing.Optional[
+        typing.Callable[[IoLoopTickState], None]
+    ] = None,
+    **monitoring_options: typing.Unpack[MonitoringOptions],
 ) -> typing.Callable[[], MonitoredSelectorEventLoop]:
     """Create a loop factory function for use with asyncio.run().
 
@@ -86,9 +269,23 @@ def monitored_asyncio_loop_factory(
     >>> import monitored_ioloop
     >>> factory = monitored_ioloop.monitored_asyncio_loop_factory(lambda state: print(state))
     >>> asyncio.run(main(), loop_factory=factory)
+
+    Only report callbacks that blocked the loop for at least 100ms:
+    >>> factory = monitored_ioloop.monitored_asyncio_loop_factory(
+    ...     lambda state: print(state), slow_callback_threshold=0.1
+    ... )
+
+    Also receive per iteration statistics (poll time, ready queue depth, callbacks run):
+    >>> factory = monitored_ioloop.monitored_asyncio_loop_factory(
+    ...     None, tick_monitor_callback=lambda tick_state: print(tick_state)
+    ... )
     """
 
     def factory() -> MonitoredSelectorEventLoop:
-        return MonitoredSelectorEventLoop(monitor_callback)
+        return MonitoredSelectorEventLoop(
+            monitor_callback,
+            tick_monitor_callback=tick_monitor_callback,
+            **monitoring_options,
+        )
 
     return factory
@@ -1,15 +1,17 @@
 import typing
 from asyncio.events import BaseDefaultEventLoopPolicy
-from monitored_ioloop.monitoring import IoLoopMonitorState
+from monitored_ioloop.monitoring import IoLoopMonitorState, MonitoringOptions
 
 
 class BaseMonitoredEventLoopPolicy(BaseDefaultEventLoopPolicy):
     def __init__(
         self,
-        monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+        monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
+        **monitoring_options: typing.Unpack[MonitoringOptions],
     ):
         super().__init__()
         self._monitor_callback = monitor_callback
+        self._monitoring_options = monitoring_options
 
     if typing.TYPE_CHECKING:
         # EventLoopPolicy doesn't implement these, but since they are marked
@@ -7,17 +7,22 @@ except ImportError:
     # pragma: no cover
     raise NoUvLoopInstalled() from None
 
+import time
 import typing
 import warnings
 
-from asyncio import Handle
+from asyncio import Handle, TimerHandle
 
 from monitored_ioloop.monitored_ioloop_base import BaseMonitoredEventLoopPolicy
 from monitored_ioloop.monitoring import (
     wrap_callback_with_monitoring,
     IoLoopMonitorState,
     IoLoopInnerState,
+    MonitoringOptions,
+    split_monitoring_options,
 )
+from monitored_ioloop.registry import loop_registry
+from monitored_ioloop.utilization import LoopUtilization
 
 if typing.TYPE_CHECKING:
     from mypy_extensions import VarArg
@@ -33,13 +38,44 @@ _Ts = typing.TypeVarTuple("_Ts")
 class MonitoredUvloopEventLoop(uvloop.Loop):
     def __init__(
         self,
-        monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+        monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
         *args: typing.Any,
-        **kwargs: typing.Any,
+        **options: typing.Unpack[MonitoringOptions],
     ):
-        super().__init__(*args, **kwargs)
+        # Any other keyword arguments are uvloop.Loop's, let it reject the ones it doesn't take.
+        monitoring_options, loop_kwargs = split_monitoring_options(options)
+        super().__init__(*args, **loop_kwargs)
         self._monitor_callback = monitor_callback
-        self._state = IoLoopInnerState(handles_count=0)
+        self._state = IoLoopInnerState(handles_count=0, **monitoring_options)
+        # The utilization is approximated by the callbacks' wall time, see loop_utilization.
+        self._state.track_callbacks_wall_time = True
+        self._state.loop_id = loop_registry.register(self)
+
+    def run_forever(self) -> None:
+        self._state.start_running()
+        try:
+            super().run_forever()
+        finally:
+            self._state.stop_running()
+
+    @property
+    def ioloop_state(self) -> IoLoopInnerState:
+        """
+        The loop's monitoring state, for helpers that need the state of the current callback.
+        """
+        return self._state
+
+    def loop_utilization(self) -> LoopUtilization:
+        """
+        The loop's cumulative idle and active time, can be called from any thread.
+        uvloop polls inside libuv, so the active time is approximated by the monitored callbacks' wall time,
+        I/O callbacks that uvloop calls directly (for example protocol.data_received) are counted as idle.
+        """
+        running_time = self._state.running_time_until(time.perf_counter())
+        active_time = min(self._state.callbacks_wall_time, running_time)
+        return LoopUtilization(
+            idle_time=running_time - active_time, active_time=active_time
+        )
 
     def call_soon(
         self,
@@ -52,6 +88,33 @@ class MonitoredUvloopEventLoop(uvloop.Loop):
         )
         return super().call_soon(callback_with_monitoring, *args, **kwargs)
 
+    def call_soon_threadsafe(
+        self,
+        callback: typing.Callable[[VarArg(*_Ts)], object],
+        *args: *_Ts,
+        **kwargs: typing.Any,
+    ) -> Handle:
+        callback_with_monitoring = wrap_callback_with_monitoring(
+            callback, self._monitor_callback, self._state, thread_safe=True
+        )
+        return super().call_soon_threadsafe(callback_with_monitoring, *args, **kwargs)
+
+    def call_later(
+        self,
+        delay: float,
+        callback: typing.Callable[[VarArg(*_Ts)], object],
+        *args: *_Ts,
+        **kwargs: typing.Any,
+    ) -> TimerHandle:
+        # uvloop implements call_at on top of call_later.
+        callback_with_monitoring = wrap_callback_with_monitoring(
+            callback,
+            self._monitor_callback,
+            self._state,
+            timer_when=self.time() + delay,
+        )
+        return super().call_later(delay, callback_with_monitoring, *args, **kwargs)
+
 
 class MonitoredUvloopEventLoopPolicy(BaseMonitoredEventLoopPolicy):
     """Event loop policy.
@@ -68,22 +131,29 @@ class MonitoredUvloopEventLoopPolicy(BaseMonitoredEventLoopPolicy):
     >>> asyncio.get_event_loop()
     """
 
-    def __init__(self, monitor_callback: typing.Callable[[IoLoopMonitorState], None]):
+    def __init__(
+        self,
+        monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
+        **monitoring_options: typing.Unpack[MonitoringOptions],
+    ):
         warnings.warn(
             "MonitoredUvloopEventLoopPolicy is deprecated. "
             "Use monitored_uvloop_loop_factory() instead.",
             DeprecationWarning,
             stacklevel=2,
         )
-        super().__init__(monitor_callback)
+        super().__init__(monitor_callback, **monitoring_options)
 
     def _loop_factory(self) -> MonitoredUvloopEventLoop:
-        loop = MonitoredUvloopEventLoop(self._monitor_callback)
+        loop = MonitoredUvloopEventLoop(
+            self._monitor_callback, **self._monitoring_options
+        )
         return loop
 
 
 def monitored_uvloop_loop_factory(
-    monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+    monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
+    **monitoring_options: typing.Unpack[MonitoringOptions],
 ) -> typing.Callable[[], MonitoredUvloopEventLoop]:
     """Create a loop factory function for use with asyncio.run().
 
@@ -92,9 +162,14 @@ def monitored_uvloop_loop_factory(
     >>> import monitored_ioloop
     >>> factory = monitored_ioloop.monitored_uvloop_loop_factory(lambda state: print(state))
     >>> asyncio.run(main(), loop_factory=factory)
+
+    Only report callbacks that blocked the loop for at least 100ms:
+    >>> factory = monitored_ioloop.monitored_uvloop_loop_factory(
+    ...     lambda state: print(state), slow_callback_threshold=0.1
+    ... )
     """
 
     def loop_factory() -> MonitoredUvloopEventLoop:
-        return MonitoredUvloopEventLoop(monitor_callback)
+        return MonitoredUvloopEventLoop(monitor_callback, **monitoring_options)
 
     return loop_factory
@@ -1,19 +1,72 @@
+import collections
 import threading
 import time
 import typing
-from asyncio import Handle
-from dataclasses import dataclass
+import weakref
+from asyncio import Handle, Task
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from logging import getLogger
 
-import wrapt
+from monitored_ioloop.formatting_utils import (
+    aggregation_callback_name,
+    aggregation_task_name,
+    pretty_format_handle,
+    pretty_callback_name,
+)
+from monitored_ioloop.histogram import LogLinearHistogram
 
-from monitored_ioloop.formatting_utils import pretty_format_handle, pretty_callback_name
+if typing.TYPE_CHECKING:
+    from monitored_ioloop.attribution import LoopCostTable
+    from monitored_ioloop.recorder import LoopEventRecorder
+    from monitored_ioloop.watchdog import LoopWatchdog
 
 logger = getLogger(__name__)
 
 
+class LazyCallbackPrettyName:
+    """
+    Lets the callback_pretty_name field of a dataclass be resolved lazily, only if it is actually read,
+    since formatting a handle (for example a Task repr) can cost more than the callback itself.
+    """
+
+    _callback_pretty_name_resolver: typing.Optional[typing.Callable[[], str]] = None
+
+    def resolve_callback_pretty_name_lazily(
+        self, resolver: typing.Callable[[], str]
+    ) -> None:
+        """
+        Replace the callback_pretty_name given to the constructor with the result of resolver,
+        that is called the first time callback_pretty_name is read.
+        """
+        del self.__dict__["callback_pretty_name"]
+        self._callback_pretty_name_resolver = resolver
+
+    def set_callback_pretty_name(self, callback_pretty_name: str) -> None:
+        """
+        Set callback_pretty_name, dropping the lazy resolver (and the callback it references) if there is one.
+        """
+        self.__dict__["callback_pretty_name"] = callback_pretty_name
+        self._callback_pretty_name_resolver = None
+
+    if not typing.TYPE_CHECKING:
+        # Hidden from type checkers, so they still catch misspelled attributes.
+
+        def __getattr__(self, name: str) -> typing.Any:
+            # Only called for attributes that are not set, callback_pretty_name is only unset while it is lazy.
+            resolver = self._callback_pretty_name_resolver
+            if name != "callback_pretty_name" or resolver is None:
+                raise AttributeError(
+                    f"{self.__class__.__name__!r} object has no attribute {name!r}"
+                )
+            callback_pretty_name = resolver()
+            # The resolver references the callback (for example a Task), don't keep it alive.
+            self.set_callback_pretty_name(callback_pretty_name)
+            return callback_pretty_name
+
+
 @dataclass
-class IoLoopMonitorState:
+class IoLoopMonitorState(LazyCallbackPrettyName):
     """
     A dataclass containing the state of the loop when the callback was executed.
     This class is the interface that the monitor callback will receive.
@@ -35,7 +88,8 @@ class IoLoopMonitorState:
 
     """
     A best effort try to give a meaningful name to the callback that was currently executed.
-    This property will come in handy when trying to debug callbacks with high wall time. 
+    This property will come in handy when trying to debug callbacks with high wall time.
+    The monitored loops resolve it lazily (see LazyCallbackPrettyName).
     """
     callback_pretty_name: str
 
@@ -49,65 +103,692 @@ class IoLoopMonitorState:
     """
     loop_lag: float
 
+    """
+    The amount of callbacks this event stands for, aggregators should weight counts by it.
+    It is 1 unless sampling is enabled (see MonitoringOptions.sample_rate) and this callback was
+    reported because it was sampled, and not because it crossed one of the thresholds.
+    """
+    sample_rate: int = 1
+
+    """
+    How late a timer callback (scheduled with call_later / call_at) ran, compared to the time it was scheduled for.
+    For timers this is also the loop_lag, since the time until the scheduled time is not lag.
+    None for callbacks that are not timers.
+    """
+    timer_lateness: typing.Optional[float] = None
+
+    """
+    For callbacks scheduled from another thread with call_soon_threadsafe (for example run_in_executor results),
+    the time from the call_soon_threadsafe call until the callback started running on the loop thread.
+    This is the handoff latency between the threads, it includes waking the loop up.
+    None for callbacks scheduled from the loop thread.
+    """
+    cross_thread_latency: typing.Optional[float] = None
+
+    """
+    When a watchdog is configured (see MonitoringOptions.watchdog), the loop thread's stacks that were sampled
+    while this callback was stalled, in collapsed stack format (root first, frames separated by ';').
+    None if the callback didn't run longer than the watchdog's stall threshold.
+    """
+    stall_stacks: typing.Optional[typing.List[str]] = None
+
+    """
+    The thread CPU time the callback used, only measured when MonitoringOptions.measure_cpu_time is set.
+    A CPU time close to the wall time means the callback is CPU bound (it belongs in a process pool),
+    a much lower one means it blocked on I/O or a lock (it belongs in a thread pool, or should be made async).
+    """
+    callback_cpu_time: typing.Optional[float] = None
+
+    """
+    The time.perf_counter() time the callback started running, for placing the callback on a timeline
+    (for example monitored_ioloop.exporters.chrome_trace). The callback was scheduled loop_lag seconds before.
+    """
+    callback_started_at: float = 0.0
+
+    """
+    A cheap, bounded cardinality name of the callback (see aggregation_callback_name), the name
+    the metrics collector aggregates it by. Unlike callback_pretty_name it doesn't contain ids or line numbers.
+    """
+    callback_name: str = ""
+
+
+@dataclass
+class TaskMonitorState:
+    """
+    The totals of all the callbacks (steps) an asyncio.Task ran on the loop, received by the task monitor callback
+    once the task is done. A coroutine runs as many steps (one per await that actually waited), so a task that blocks
+    the loop for 20ms ten times only shows up as slow here.
+    """
+
+    """
+    The task that is done.
+    """
+    task: "Task[typing.Any]"
+
+    """
+    The total wall time of the task's steps, its cost on the loop.
+    """
+    total_wall_time: float = 0.0
+
+    """
+    The amount of steps the task ran on the loop.
+    """
+    steps: int = 0
+
+    """
+    The wall time of the task's longest step.
+    """
+    max_step_wall_time: float = 0.0
+
+    """
+    The total loop lag of the task's steps, the time it was ready to run but waited for other callbacks.
+    """
+    total_loop_lag: float = 0.0
+
+    @property
+    def task_name(self) -> str:
+        """
+        The task's name if it was set (for example by MonitoredIOLoopMiddleware), otherwise its coroutine's name.
+        """
+        return aggregation_task_name(self.task)
+
+
+@dataclass
+class IoLoopTickState:
+    """
+    Statistics of a single loop iteration (tick), received by the tick monitor callback.
+    Every tick the loop waits for I/O in the selector (poll), then runs the callbacks that are ready.
+    """
+
+    """
+    The time the loop spent blocked in the selector waiting for I/O or for the next timer.
+    """
+    poll_time: float
+
+    """
+    The amount of handles in the ready queue when the tick started, before polling.
+    A growing depth means the loop can't keep up with the work it is given.
+    """
+    ready_count: int
+
+    """
+    The amount of handles the tick ran (including I/O callbacks and expired timers, that are
+    not in the ready queue when the tick starts).
+    """
+    callbacks_run: int
+
+    """
+    The wall time of the whole tick, poll_time included.
+    """
+    tick_duration: float
+
+    @property
+    def busy_time(self) -> float:
+        """
+        The time the loop was busy running callbacks (and processing I/O events) during the tick.
+        """
+        return self.tick_duration - self.poll_time
+
+
+@dataclass
+class LoopMetricsSnapshot:
+    """
+    The aggregated loop metrics collected between started_at and taken_at (both time.time() timestamps).
+    histograms maps a metric name (for example "callback_wall_time") to a histogram per callback name.
+    """
+
+    started_at: float
+    taken_at: float
+    histograms: typing.Dict[str, typing.Dict[str, LogLinearHistogram]]
+
+
+class LoopMetricsCollector:
+    """
+    Aggregates the callbacks' wall time and loop lag into log-linear histograms keyed by callback name.
+    The aggregation happens on the loop thread and costs a couple of dict lookups per callback,
+    exporters then read the aggregates periodically instead of receiving every event.
+
+    Usage:
+    >>> collector = LoopMetricsCollector()
+    >>> factory = monitored_asyncio_loop_factory(None, metrics_collector=collector)
+    >>> asyncio.run(main(), loop_factory=factory)
+    >>> collector.snapshot(reset=True).histograms["callback_wall_time"]["main"].percentile(0.99)
+
+    The callback names are cheap, bounded cardinality names (see aggregation_callback_name),
+    not the callback_pretty_name that the monitor callback receives.
+    A collector can be shared by several loops as long as they run on the same thread.
+    """
+
+    CALLBACK_WALL_TIME = "callback_wall_time"
+    LOOP_LAG = "loop_lag"
+    CROSS_THREAD_LATENCY = "cross_thread_latency"
+    TICK_POLL_TIME = "tick_poll_time"
+    TICK_DURATION = "tick_duration"
+    TICK_CALLBACKS_RUN = "tick_callbacks_run"
+    PROBE_LAG = "probe_lag"
+    REQUEST_QUEUEING_DELAY = "request_queueing_delay"
+    REQUEST_LOOP_TIME = "request_loop_time"
+    """
+    Tick and probe metrics describe the whole loop, so they are recorded under this name.
+    """
+    LOOP_NAME = "loop"
+
+    def __init__(self, sub_buckets: int = 8):
+        self._sub_buckets = sub_buckets
+        self._started_at = time.time()
+        self._histograms: typing.Dict[str, typing.Dict[str, LogLinearHistogram]] = {}
+        self._snapshot_lock = threading.Lock()
+
+    def observe(self, metric: str, name: str, value: float, count: int = 1) -> None:
+        """
+        Record a value (count times), must be called from the loop thread.
+        """
+        histograms = self._histograms.get(metric)
+        if histograms is None:
+            histograms = self._histograms.setdefault(metric, {})
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms.setdefault(
+                name, LogLinearHistogram(self._sub_buckets)
+            )
+        histogram.record(value, count)
+
+    def record_callback(
+        self,
+        name: str,
+        wall_time: float,
+        loop_lag: float,
+        sample_rate: int = 1,
+        cross_thread_latency: typing.Optional[float] = None,
+    ) -> None:
+        self.observe(self.CALLBACK_WALL_TIME, name, wall_time, sample_rate)
+        self.observe(self.LOOP_LAG, name, loop_lag, sample_rate)
+        if cross_thread_latency is not None:
+            self.observe(
+                self.CROSS_THREAD_LATENCY, name, cross_thread_latency, sample_rate
+            )
+
+    def record_tick(self, tick_state: IoLoopTickState) -> None:
+        self.observe(self.TICK_POLL_TIME, self.LOOP_NAME, tick_state.poll_time)
+        self.observe(self.TICK_DURATION, self.LOOP_NAME, tick_state.tick_duration)
+        self.observe(self.TICK_CALLBACKS_RUN, self.LOOP_NAME, tick_state.callbacks_run)
+
+    def snapshot(self, reset: bool = False) -> LoopMetricsSnapshot:
+        """
+        Copy the aggregated metrics, can be called from any thread.
+        When reset is set the aggregation starts over, values recorded by the loop thread
+        while the snapshot is taken may end up in either window (or, rarely, be lost).
+        """
+        with self._snapshot_lock:
+            taken_at = time.time()
+            started_at = self._started_at
+            histograms = self._histograms
+            if reset:
+                self._histograms = {}
+                self._started_at = taken_at
+            return LoopMetricsSnapshot(
+                started_at=started_at,
+                taken_at=taken_at,
+                histograms={
+                    metric: {
+                        name: histogram.copy()
+                        for name, histogram in list(by_name.items())
+                    }
+                    for metric, by_name in list(histograms.items())
+                },
+            )
+
+
+class LoopTimeAccount:
+    """
+    The loop time charged to a context, see monitored_ioloop.attribution.loop_time_account.
+    """
+
+    __slots__ = ("wall_time", "steps")
+
+    def __init__(self) -> None:
+        self.wall_time = 0.0
+        self.steps = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(wall_time={self.wall_time!r}, steps={self.steps!r})"
+
+
+_loop_time_account: ContextVar[typing.Optional[LoopTimeAccount]] = ContextVar(
+    "monitored_ioloop_loop_time_account", default=None
+)
+
+
+class MonitoringOptions(typing.TypedDict, total=False):
+    """
+    Optional settings accepted by the monitored loops, loop factories and policies.
+
+    * slow_callback_threshold - Only callbacks whose wall time is at least this long (in seconds)
+      are reported to the monitor callback. Defaults to 0, meaning every callback is reported.
+    * loop_lag_threshold - When set, callbacks whose loop lag is at least this long (in seconds)
+      are reported as well, even if they were fast.
+    * metrics_collector - A LoopMetricsCollector that aggregates every callback, regardless of the thresholds.
+      The asyncio loop also aggregates its tick statistics into it (see IoLoopTickState).
+    * sample_rate - When set to N, one in every N callbacks that are below the thresholds is reported as well,
+      with IoLoopMonitorState.sample_rate set to N. Callbacks that crossed a threshold are always reported
+      (with a sample_rate of 1), so weighting the events by their sample_rate gives unbiased counts.
+      When sampling is enabled the metrics collector only aggregates the reported callbacks (weighted the same way).
+      Sampling only makes sense together with a slow_callback_threshold. It cuts down the reporting work,
+      not the monitoring overhead: every callback is still wrapped and timed to compare it with the thresholds.
+    * measure_cpu_time - Measure the thread CPU time of the reported callbacks (IoLoopMonitorState.callback_cpu_time).
+      It adds a clock read to every callback, and another one to the reported ones (crossing a threshold or sampled).
+    * task_monitor_callback - Called with a TaskMonitorState, the totals of all the steps of an asyncio.Task,
+      once the task is done. Every step is accounted for, regardless of the thresholds and sampling.
+    * cost_table - A LoopCostTable that aggregates every callback by the cost label of its context
+      (for example the route set by MonitoredIOLoopMiddleware), see monitored_ioloop.attribution.
+    * watchdog - A LoopWatchdog that samples the loop thread's stack while a callback is stalled,
+      see monitored_ioloop.watchdog.
+    * event_recorder - A LoopEventRecorder that writes every reported callback (crossing a threshold or sampled)
+      into a compact binary log for offline analysis, see monitored_ioloop.recorder.
+    * track_current_callback - Track the start time and loop lag of the running callback from the loop's start,
+      instead of from the moment a helper that reads them enables it (see IoLoopInnerState.track_current_callback).
+
+    Callbacks that are filtered out cost two clock reads and a few attribute checks,
+    no IoLoopMonitorState is created and the monitor callback is not called.
+    On top of that every callback pays for the options that account all the callbacks (metrics_collector,
+    measure_cpu_time, task_monitor_callback and cost_table), and for the bookkeeping that is only enabled
+    when something reads it (see IoLoopInnerState.track_current_callback and track_callbacks_wall_time).
+    """
+
+    slow_callback_threshold: float
+    loop_lag_threshold: typing.Optional[float]
+    metrics_collector: typing.Optional[LoopMetricsCollector]
+    sample_rate: typing.Optional[int]
+    measure_cpu_time: bool
+    task_monitor_callback: typing.Optional[typing.Callable[[TaskMonitorState], None]]
+    cost_table: typing.Optional["LoopCostTable"]
+    watchdog: typing.Optional["LoopWatchdog"]
+    event_recorder: typing.Optional["LoopEventRecorder"]
+    track_current_callback: bool
+
+
+def split_monitoring_options(
+    options: typing.Mapping[str, typing.Any],
+) -> typing.Tuple[MonitoringOptions, typing.Dict[str, typing.Any]]:
+    """
+    Split a monitored loop's keyword arguments into its MonitoringOptions and the rest,
+    which are forwarded to the base loop (for example SelectorEventLoop's selector).
+    """
+    monitoring_options: typing.Dict[str, typing.Any] = {}
+    loop_kwargs: typing.Dict[str, typing.Any] = {}
+    for name, value in options.items():
+        if name in MonitoringOptions.__optional_keys__:
+            monitoring_options[name] = value
+        else:
+            loop_kwargs[name] = value
+    return typing.cast(MonitoringOptions, monitoring_options), loop_kwargs
+
 
 @dataclass
 class IoLoopInnerState:
+    """
+    The inner state of a single monitored loop, loops never share their state.
+    """
+
+    """
+    The amount of handles in the loop, only ever modified from the loop thread.
+    """
     handles_count: int
-    handles_count_lock = threading.Lock()
+
+    """
+    Handles added from other threads (via call_soon_threadsafe) are queued here
+    and folded into handles_count by the loop thread, so the loop thread never has to take a lock.
+    """
+    thread_safe_added_handles: typing.Deque[int] = field(
+        default_factory=collections.deque
+    )
+
+    """
+    See MonitoringOptions.
+    """
+    slow_callback_threshold: float = 0.0
+    loop_lag_threshold: typing.Optional[float] = None
+    metrics_collector: typing.Optional[LoopMetricsCollector] = None
+    sample_rate: typing.Optional[int] = None
+    measure_cpu_time: bool = False
+    task_monitor_callback: typing.Optional[
+        typing.Callable[[TaskMonitorState], None]
+    ] = None
+    cost_table: typing.Optional["LoopCostTable"] = None
+    watchdog: typing.Optional["LoopWatchdog"] = None
+    event_recorder: typing.Optional["LoopEventRecorder"] = None
+
+    """
+    The amount of callbacks below the thresholds left until the next one is sampled.
+    """
+    callbacks_until_sample: int = 1
+
+    """
+    Event loop utilization bookkeeping (see monitored_ioloop.utilization), in time.perf_counter() seconds.
+    running_time is the time the loop ran until the current run started at running_since (None when not running).
+    callbacks_wall_time sums up the callbacks' wall time, only when track_callbacks_wall_time is set
+    (by the loops that measure their utilization with it).
+    """
+    running_time: float = 0.0
+    running_since: typing.Optional[float] = None
+    callbacks_wall_time: float = 0.0
+    track_callbacks_wall_time: bool = False
+
+    """
+    The totals of the tasks that are not done yet, only tracked when there is a task monitor callback.
+    The tasks are weakly referenced, so a pending task that is dropped doesn't leak.
+    """
+    task_states: "weakref.WeakKeyDictionary[Task[typing.Any], TaskMonitorState]" = (
+        field(default_factory=weakref.WeakKeyDictionary)
+    )
+
+    """
+    The time the last (or currently running) callback started, and its loop lag.
+    Helpers read them while the callback is running, for example LoopLagMiddleware for the request's queueing delay.
+    They are only updated when track_current_callback is set, by the watchdog, LoopLagMiddleware
+    and the loop registry's snapshot (or by the track_current_callback monitoring option).
+    """
+    current_callback_started_at: float = 0.0
+    current_callback_loop_lag: float = 0.0
+    track_current_callback: bool = False
+
+    """
+    The thread running (or that last ran) the loop, set when the loop starts running.
+    """
+    thread_id: typing.Optional[int] = None
+    thread_name: typing.Optional[str] = None
+
+    """
+    Only tracked when track_current_callback is set: the callback that is currently running (None between callbacks).
+    The watchdog thread and the loop registry read it.
+    """
+    current_callback: typing.Optional["MonitoredCallbackWrapper"] = None
+
+    """
+    The loop's process unique id in the loop registry (see monitored_ioloop.registry).
+    """
+    loop_id: typing.Optional[int] = None
+
+    """
+    When set, every callback's wall time is charged to the LoopTimeAccount of its context (if there is one).
+    LoopLagMiddleware sets it on the loop it runs on.
+    """
+    account_loop_time: bool = False
+
+    def __post_init__(self) -> None:
+        if self.sample_rate is not None and self.sample_rate < 1:
+            raise ValueError("sample_rate must be a positive integer.")
+
+    def start_running(self) -> None:
+        """
+        Must be called from the loop thread when the loop starts running.
+        """
+        self.running_since = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        if self.watchdog is not None:
+            self.track_current_callback = True
+            self.watchdog.watch(self)
+
+    def stop_running(self) -> None:
+        """
+        Must be called from the loop thread when the loop stops running.
+        """
+        if self.running_since is not None:
+            self.running_time += time.perf_counter() - self.running_since
+            self.running_since = None
+        if self.watchdog is not None:
+            self.watchdog.unwatch(self)
+
+    def running_time_until(self, now: float) -> float:
+        """
+        The total time the loop was running until now, can be called from any thread.
+        """
+        running_since = self.running_since
+        if running_since is None:
+            return self.running_time
+        return self.running_time + now - running_since
+
+    def account_task_step(
+        self,
+        callback: typing.Callable[..., typing.Any],
+        wall_time: float,
+        loop_lag: float,
+    ) -> None:
+        """
+        Add a callback to the totals of the task it is a step of (if any),
+        and call the task monitor callback if the task is done.
+        Must be called from the loop thread.
+        """
+        task = getattr(callback, "__self__", None)
+        if not isinstance(task, Task):
+            return
+        task_state = self.task_states.get(task)
+        if task_state is None:
+            task_state = self.task_states[task] = TaskMonitorState(task=task)
+        task_state.total_wall_time += wall_time
+        task_state.steps += 1
+        if wall_time > task_state.max_step_wall_time:
+            task_state.max_step_wall_time = wall_time
+        task_state.total_loop_lag += loop_lag
+        if not task.done() or self.task_monitor_callback is None:
+            return
+        del self.task_states[task]
+        try:
+            self.task_monitor_callback(task_state)
+        except Exception:
+            logger.warning("Task monitor callback failed.", exc_info=True)
+
+    def increase_handles_count(self, increase_by: int) -> None:
+        """
+        Increase the amount of total handles.
+        Must be called from the loop thread.
+        """
+        self.handles_count += increase_by
 
     def increase_handles_count_thread_safe(self, increase_by: int) -> None:
         """
-        Increase the amount of total handles in a thread safe way.
+        Increase the amount of total handles, can be called from any thread.
+        deque.append is atomic so no lock is needed.
         """
-        with self.handles_count_lock:
-            self.handles_count += increase_by
+        self.thread_safe_added_handles.append(increase_by)
 
-    def decrease_handles_count_thread_safe(self, decrease_by: int) -> None:
+    def decrease_handles_count(self, decrease_by: int) -> None:
         """
-        Decrease the amount of total handles in a thread safe way.
+        Decrease the amount of total handles.
+        Must be called from the loop thread.
         """
-        with self.handles_count_lock:
-            self.handles_count -= decrease_by
+        self.handles_count -= decrease_by
+        while self.thread_safe_added_handles:
+            self.handles_count += self.thread_safe_added_handles.popleft()
 
 
-class MonitoredCallbackWrapper(wrapt.ObjectProxy):  # type: ignore
+class MonitoredCallbackWrapper:
+    """
+    The callable that is scheduled on the loop instead of the original callback.
+    This object is allocated for every scheduled callback, so it is kept as small as possible (__slots__, no proxying
+    on the hot path). Attributes that aren't found on the wrapper (for example __qualname__ or __self__ that asyncio
+    uses to format handles) are looked up on the original callback, and __wrapped__ lets inspect.unwrap reach it.
+    """
+
+    __slots__ = (
+        "__wrapped__",
+        "_monitor_callback",
+        "_ioloop_state",
+        "_added_to_loop_time",
+        "_timer_when",
+        "_thread_safe",
+        "_handle",
+        "_stall_stacks",
+    )
+
     def __init__(
         self,
         callback: typing.Callable[..., typing.Any],
-        monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+        monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
         io_loop_state: IoLoopInnerState,
+        timer_when: typing.Optional[float] = None,
+        thread_safe: bool = False,
     ):
-        super().__init__(callback)
-        self._self_original_callback = callback
-        self._self_monitor_callback = monitor_callback
-        self._self_ioloop_state = io_loop_state
-        self._self_added_to_loop_time = time.perf_counter()
-        self._self_handle: typing.Optional[Handle] = None
+        self.__wrapped__ = callback
+        self._monitor_callback = monitor_callback
+        self._ioloop_state = io_loop_state
+        self._added_to_loop_time = time.perf_counter()
+        self._timer_when = timer_when
+        self._thread_safe = thread_safe
+        self._handle: typing.Optional[Handle] = None
+        self._stall_stacks: typing.Optional[typing.List[str]] = None
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.__wrapped__, name)
+
+    @property  # type: ignore[misc]
+    def __class__(self) -> type:
+        # Like wrapt's proxies, so isinstance checks (for example asyncio formatting functools.partial) see the callback.
+        return self.__wrapped__.__class__
+
+    def __repr__(self) -> str:
+        return repr(self.__wrapped__)
 
     def set_handle(self, handle: Handle) -> None:
-        self._self_handle = handle
+        self._handle = handle
 
-    def __call__(self, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
-        loop_lag = time.perf_counter() - self._self_added_to_loop_time
+    def add_stall_stack(self, stack: str, max_stacks: int) -> None:
+        """
+        Called by the watchdog thread with a stack sampled while this callback is stalled.
+        """
+        if self._stall_stacks is None:
+            self._stall_stacks = []
+        if len(self._stall_stacks) < max_stacks:
+            self._stall_stacks.append(stack)
+
+    def _resolve_pretty_name(self) -> str:
+        if self._handle:
+            return pretty_format_handle(self._handle)
+        return pretty_callback_name(self.__wrapped__)
+
+    def __call__(self, *args: typing.Any) -> typing.Any:
         start_wall_time = time.perf_counter()
-        response = self._self_original_callback(*args, **kwargs)
-        self._self_ioloop_state.decrease_handles_count_thread_safe(1)
+        timer_lateness = cross_thread_latency = None
+        if self._timer_when is None:
+            loop_lag = start_wall_time - self._added_to_loop_time
+            if self._thread_safe:
+                cross_thread_latency = loop_lag
+        else:
+            # Both asyncio's and uvloop's loop.time() are based on the monotonic clock.
+            loop_lag = timer_lateness = time.monotonic() - self._timer_when
+        ioloop_state = self._ioloop_state
+        start_cpu_time = time.thread_time() if ioloop_state.measure_cpu_time else 0.0
+        if not ioloop_state.track_current_callback:
+            response = self.__wrapped__(*args)
+        else:
+            ioloop_state.current_callback_started_at = start_wall_time
+            ioloop_state.current_callback_loop_lag = loop_lag
+            ioloop_state.current_callback = self
+            try:
+                response = self.__wrapped__(*args)
+            finally:
+                ioloop_state.current_callback = None
+        if self._timer_when is None:
+            ioloop_state.decrease_handles_count(1)
         wall_duration = time.perf_counter() - start_wall_time
 
+        sample_rate = 1
+        if wall_duration >= ioloop_state.slow_callback_threshold or (
+            ioloop_state.loop_lag_threshold is not None
+            and loop_lag >= ioloop_state.loop_lag_threshold
+        ):
+            report = True
+        elif ioloop_state.sample_rate is not None:
+            ioloop_state.callbacks_until_sample -= 1
+            report = not ioloop_state.callbacks_until_sample
+            if report:
+                ioloop_state.callbacks_until_sample = sample_rate = (
+                    ioloop_state.sample_rate
+                )
+        else:
+            report = False
+
+        # The CPU time is only read again for callbacks that are reported, and before the accounting below
+        # (that can run the task monitor callback), so it only covers the callback itself.
+        callback_cpu_time = None
+        if report and ioloop_state.measure_cpu_time:
+            callback_cpu_time = time.thread_time() - start_cpu_time
+
+        if ioloop_state.track_callbacks_wall_time:
+            ioloop_state.callbacks_wall_time += wall_duration
+        if ioloop_state.task_monitor_callback is not None:
+            ioloop_state.account_task_step(self.__wrapped__, wall_duration, loop_lag)
+        if ioloop_state.cost_table is not None:
+            try:
+                ioloop_state.cost_table.charge_current_context(wall_duration, loop_lag)
+            except Exception:
+                logger.warning("Cost table failed.", exc_info=True)
+        if ioloop_state.account_loop_time:
+            loop_time_account = _loop_time_account.get()
+            if loop_time_account is not None:
+                loop_time_account.wall_time += wall_duration
+                loop_time_account.steps += 1
+
+        if not report and ioloop_state.sample_rate is not None:
+            # With sampling the collector only aggregates the reported callbacks,
+            # without it the callbacks below the thresholds as well.
+            return response
+
+        callback_name = None
+        if ioloop_state.metrics_collector is not None:
+            callback_name = aggregation_callback_name(self.__wrapped__)
+            try:
+                ioloop_state.metrics_collector.record_callback(
+                    callback_name,
+                    wall_duration,
+                    loop_lag,
+                    sample_rate,
+                    cross_thread_latency,
+                )
+            except Exception:
+                logger.warning("Metrics collector failed.", exc_info=True)
+
+        if not report or (
+            ioloop_state.event_recorder is None and self._monitor_callback is None
+        ):
+            return response
+        if callback_name is None:
+            callback_name = aggregation_callback_name(self.__wrapped__)
+
+        if ioloop_state.event_recorder is not None:
+            try:
+                ioloop_state.event_recorder.record(
+                    callback_name,
+                    wall_duration,
+                    loop_lag,
+                    ioloop_state.handles_count,
+                    sample_rate,
+                )
+            except Exception:
+                logger.warning("Event recorder failed.", exc_info=True)
+
+        if self._monitor_callback is None:
+            return response
+
         try:
-            pretty_name = (
-                pretty_format_handle(self._self_handle)
-                if self._self_handle
-                else pretty_callback_name(self._self_original_callback)
+            ioloop_monitor_state = IoLoopMonitorState(
+                callback_wall_time=wall_duration,
+                callback_pretty_name="",
+                loop_handles_count=ioloop_state.handles_count,
+                loop_lag=loop_lag,
+                sample_rate=sample_rate,
+                timer_lateness=timer_lateness,
+                cross_thread_latency=cross_thread_latency,
+                stall_stacks=self._stall_stacks,
+                callback_cpu_time=callback_cpu_time,
+                callback_started_at=start_wall_time,
+                callback_name=callback_name,
             )
-            self._self_monitor_callback(
-                IoLoopMonitorState(
-                    callback_wall_time=wall_duration,
-                    loop_handles_count=self._self_ioloop_state.handles_count,
-                    loop_lag=loop_lag,
-                    callback_pretty_name=pretty_name,
-                )
+            ioloop_monitor_state.resolve_callback_pretty_name_lazily(
+                self._resolve_pretty_name
             )
+            self._monitor_callback(ioloop_monitor_state)
         except Exception:
             logger.warning("Monitor callback failed.", exc_info=True)
         return response
@@ -115,8 +796,22 @@ class MonitoredCallbackWrapper(wrapt.ObjectProxy):  # type: ignore
 
 def wrap_callback_with_monitoring(
     callback: typing.Callable[..., typing.Any],
-    monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+    monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
     ioloop_state: IoLoopInnerState,
+    thread_safe: bool = False,
+    timer_when: typing.Optional[float] = None,
 ) -> MonitoredCallbackWrapper:
-    ioloop_state.increase_handles_count_thread_safe(1)
-    return MonitoredCallbackWrapper(callback, monitor_callback, ioloop_state)
+    """
+    Wrap the callback with monitoring, the thread_safe flag should be set when
+    the callback is scheduled from outside the loop thread (call_soon_threadsafe).
+    timer_when is the loop time a timer callback (call_later / call_at) is scheduled for,
+    timers are not counted in the loop handles count since they are not ready to run yet.
+    """
+    if timer_when is None:
+        if thread_safe:
+            ioloop_state.increase_handles_count_thread_safe(1)
+        else:
+            ioloop_state.increase_handles_count(1)
+    return MonitoredCallbackWrapper(
+        callback, monitor_callback, ioloop_state, timer_when, thread_safe
+    )
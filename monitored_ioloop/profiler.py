@@ -0,0 +1,68 @@
+import threading
+import typing
+
+from monitored_ioloop.watchdog import LoopStall
+
+
+class StallProfiler:
+    """
+    A statistical profiler of stalled loops, fed by a LoopWatchdog's on_stall.
+    Since the watchdog only samples the loop thread while a callback runs longer than its stall_threshold,
+    the profile only covers the slow callbacks, and costs nothing while the loop is healthy.
+
+    The samples are counted per (callback_name, stack), and exported in collapsed stack format
+    ("callback name;frame;frame count" lines), ready for flamegraph.pl or speedscope.
+    Memory is bounded by max_stacks unique stacks, when a new stack doesn't fit the least sampled one is evicted
+    (its samples are counted in evicted_samples), so the profiler can run for days.
+
+    Usage:
+    >>> profiler = StallProfiler()
+    >>> watchdog = LoopWatchdog(stall_threshold=0.1, on_stall=profiler)
+    >>> factory = monitored_asyncio_loop_factory(None, watchdog=watchdog)
+    >>> ...
+    >>> Path("stalls.collapsed").write_text(profiler.collapsed())
+    """
+
+    def __init__(self, max_stacks: int = 10_000):
+        if max_stacks <= 0:
+            raise ValueError("max_stacks must be positive.")
+        self.max_stacks = max_stacks
+        self.evicted_samples = 0
+        self._counts: typing.Dict[typing.Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, stall: LoopStall) -> None:
+        # The collapsed format separates frames with ';', so the name must not contain one.
+        key = (stall.callback_name.replace(";", ","), stall.stack)
+        with self._lock:
+            count = self._counts.get(key)
+            if count is None and len(self._counts) >= self.max_stacks:
+                evicted_key = min(self._counts, key=self._counts.__getitem__)
+                self.evicted_samples += self._counts.pop(evicted_key)
+            self._counts[key] = (count or 0) + 1
+
+    def snapshot(self, reset: bool = False) -> typing.Dict[str, typing.Dict[str, int]]:
+        """
+        The sample counts per callback name and stack, can be called from any thread.
+        """
+        with self._lock:
+            counts = self._counts
+            if reset:
+                self._counts = {}
+                self.evicted_samples = 0
+            else:
+                counts = dict(counts)
+        by_name: typing.Dict[str, typing.Dict[str, int]] = {}
+        for (name, stack), count in counts.items():
+            by_name.setdefault(name, {})[stack] = count
+        return by_name
+
+    def collapsed(self, reset: bool = False) -> str:
+        """
+        The profile in collapsed stack format, the callback name is the root frame of every stack.
+        """
+        return "".join(
+            f"{name};{stack} {count}\n"
+            for name, stacks in self.snapshot(reset).items()
+            for stack, count in stacks.items()
+        )
@@ -0,0 +1,272 @@
+import errno
+import mmap
+import os
+import struct
+import time
+import typing
+from collections import deque
+
+from monitored_ioloop.exceptions import NoNumpyInstalled
+
+if typing.TYPE_CHECKING:
+    import numpy
+
+# A record per callback: the wall clock time (time.time()) the callback started, its wall time and loop lag,
+# the loop handles count, the id of the callback's name (its line in the names file) and its sample rate.
+RECORD = struct.Struct("<dddqII")
+NAMES_FILE_NAME = "names.txt"
+EVENTS_FILE_PREFIX = "events-"
+EVENTS_FILE_SUFFIX = ".bin"
+PREALLOCATE_CHUNK_SIZE = 1024 * 1024
+
+
+def _events_file_index(file_name: str) -> typing.Optional[int]:
+    if not (
+        file_name.startswith(EVENTS_FILE_PREFIX)
+        and file_name.endswith(EVENTS_FILE_SUFFIX)
+    ):
+        return None
+    index = file_name[len(EVENTS_FILE_PREFIX) : -len(EVENTS_FILE_SUFFIX)]
+    return int(index) if index.isdigit() else None
+
+
+def events_files(directory: str) -> typing.List[str]:
+    """
+    The events files in the directory, oldest first.
+    """
+    indexed_files = []
+    for file_name in os.listdir(directory):
+        index = _events_file_index(file_name)
+        if index is not None:
+            indexed_files.append((index, os.path.join(directory, file_name)))
+    return [path for _, path in sorted(indexed_files)]
+
+
+def read_names(directory: str) -> typing.List[str]:
+    """
+    The recorded callback names, indexed by their name id.
+    """
+    names_path = os.path.join(directory, NAMES_FILE_NAME)
+    if not os.path.exists(names_path):
+        return []
+    with open(names_path, encoding="utf-8") as names_file:
+        return names_file.read().splitlines()
+
+
+def _preallocate(events_file: typing.BinaryIO, size: int) -> None:
+    """
+    Allocate the file's disk blocks up front. Writing into a sparse memory mapped file allocates the blocks
+    on page faults, so a full disk would kill the process with a SIGBUS instead of raising an OSError here.
+    """
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(events_file.fileno(), 0, size)
+            return
+        except OSError as error:
+            # Not supported by the file system, fall back to writing zeros.
+            if error.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    zeros = bytes(min(size, PREALLOCATE_CHUNK_SIZE))
+    events_file.seek(0)
+    for offset in range(0, size, len(zeros)):
+        events_file.write(zeros[: size - offset])
+    events_file.flush()
+
+
+class LoopEventRecorder:
+    """
+    Records the reported callbacks into fixed width binary records (see RECORD), for offline analysis.
+    The records are written into a memory mapped file that is preallocated with records_per_file records,
+    so recording is a struct.pack_into, the OS writes the pages back in the background.
+    The files' disk space is allocated when they are created, so a full disk raises an OSError
+    (that the monitored loop logs) rather than crashing the process when a page is written.
+    Once a file is full the recorder moves on to a new one, and deletes the oldest files beyond max_files.
+
+    The callback names are interned: every name is appended once to the names file,
+    and the records reference it by its line number. The names are the cheap aggregation names
+    (see aggregation_callback_name), so the names file stays small.
+
+    The recorder is passed to the loop with the event_recorder monitoring option, it records the callbacks
+    that are reported (see slow_callback_threshold, loop_lag_threshold and sample_rate).
+    It is single producer, use a directory per monitored loop.
+
+    Usage:
+    >>> with LoopEventRecorder("/var/log/loop-events") as recorder:
+    >>>     factory = monitored_asyncio_loop_factory(None, event_recorder=recorder, slow_callback_threshold=0.001)
+    >>>     asyncio.run(main(), loop_factory=factory)
+    >>> records, names = load_events("/var/log/loop-events")
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        records_per_file: int = 1_000_000,
+        max_files: typing.Optional[int] = 10,
+    ):
+        if records_per_file <= 0:
+            raise ValueError("records_per_file must be positive.")
+        if max_files is not None and max_files <= 0:
+            raise ValueError("max_files must be positive.")
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._file_size = records_per_file * RECORD.size
+        self._max_files = max_files
+        # Recording into an existing directory keeps its name ids and files.
+        self._names = {
+            name: name_id for name_id, name in enumerate(read_names(directory))
+        }
+        self._names_file = open(
+            os.path.join(directory, NAMES_FILE_NAME), "a", encoding="utf-8"
+        )
+        self._files = deque(events_files(directory))
+        self._next_file_index = (
+            typing.cast(int, _events_file_index(os.path.basename(self._files[-1]))) + 1
+            if self._files
+            else 0
+        )
+        self._closed = False
+        self._open_next_file()
+
+    def _open_next_file(self) -> None:
+        """
+        Preallocate and map the next events file, deleting the oldest ones beyond max_files.
+        """
+        path = os.path.join(
+            self._directory,
+            f"{EVENTS_FILE_PREFIX}{self._next_file_index:06d}{EVENTS_FILE_SUFFIX}",
+        )
+        self._next_file_index += 1
+        with open(path, "w+b") as events_file:
+            try:
+                _preallocate(events_file, self._file_size)
+            except OSError:
+                events_file.close()
+                os.remove(path)
+                raise
+            self._mmap = mmap.mmap(events_file.fileno(), self._file_size)
+        self._offset = 0
+        self._files.append(path)
+        while self._max_files is not None and len(self._files) > self._max_files:
+            os.remove(self._files.popleft())
+
+    def _intern(self, name: str) -> int:
+        name_id = self._names[name] = len(self._names)
+        # The names file is line based.
+        self._names_file.write(name.replace("\n", " ") + "\n")
+        self._names_file.flush()
+        return name_id
+
+    def record(
+        self,
+        name: str,
+        wall_time: float,
+        loop_lag: float,
+        handles_count: int,
+        sample_rate: int = 1,
+    ) -> None:
+        """
+        Record a callback that just finished running, must be called from the loop thread.
+        Once the recorder is closed the records are dropped.
+        """
+        if self._closed:
+            return
+        name_id = self._names.get(name)
+        if name_id is None:
+            name_id = self._intern(name)
+        if self._offset == self._file_size:
+            # The full file stays mapped until the next one is ready, so a failed rotation is retried.
+            full_mmap = self._mmap
+            self._open_next_file()
+            full_mmap.close()
+        RECORD.pack_into(
+            self._mmap,
+            self._offset,
+            time.time() - wall_time,
+            wall_time,
+            loop_lag,
+            handles_count,
+            name_id,
+            sample_rate,
+        )
+        self._offset += RECORD.size
+
+    def close(self) -> None:
+        """
+        Flush the records, and truncate the current file to the records that were written.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._mmap.flush()
+        self._mmap.close()
+        with open(self._files[-1], "r+b") as events_file:
+            events_file.truncate(self._offset)
+        self._names_file.close()
+
+    def __enter__(self) -> "LoopEventRecorder":
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        self.close()
+
+
+def _numpy() -> typing.Any:
+    try:
+        import numpy
+    except ImportError:
+        raise NoNumpyInstalled() from None
+    return numpy
+
+
+def events_dtype() -> "numpy.dtype[typing.Any]":
+    """
+    The NumPy structured dtype of a record (see RECORD).
+    """
+    return typing.cast(
+        "numpy.dtype[typing.Any]",
+        _numpy().dtype(
+            [
+                ("timestamp", "<f8"),
+                ("wall_time", "<f8"),
+                ("loop_lag", "<f8"),
+                ("handles_count", "<i8"),
+                ("name_id", "<u4"),
+                ("sample_rate", "<u4"),
+            ]
+        ),
+    )
+
+
+def iter_events(
+    directory: str, chunk_size: int = 1_000_000
+) -> typing.Iterator["numpy.ndarray[typing.Any, typing.Any]"]:
+    """
+    Stream the recorded events as NumPy structured arrays (see events_dtype) of at most chunk_size records,
+    oldest first. The files are memory mapped, so only the chunk that is being processed has to fit in memory.
+    The preallocated records a recorder didn't write yet (it is still recording, or wasn't closed) are skipped.
+    """
+    numpy = _numpy()
+    dtype = events_dtype()
+    for path in events_files(directory):
+        records_count = os.path.getsize(path) // dtype.itemsize
+        if not records_count:
+            continue
+        records = numpy.memmap(path, dtype=dtype, mode="r", shape=(records_count,))
+        # Records are written in order, so the unwritten ones are the trailing zeroed records.
+        written = numpy.flatnonzero(records["timestamp"])
+        records_count = int(written[-1]) + 1 if len(written) else 0
+        for start in range(0, records_count, chunk_size):
+            yield numpy.array(records[start : min(start + chunk_size, records_count)])
+
+
+def load_events(
+    directory: str,
+) -> typing.Tuple["numpy.ndarray[typing.Any, typing.Any]", typing.List[str]]:
+    """
+    Load all the recorded events into a single NumPy structured array, together with the names
+    (indexed by the records' name_id). Use iter_events for recordings that don't fit in memory.
+    """
+    numpy = _numpy()
+    chunks = list(iter_events(directory))
+    records = numpy.concatenate(chunks) if chunks else numpy.empty(0, events_dtype())
+    return records, read_names(directory)
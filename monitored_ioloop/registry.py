@@ -0,0 +1,133 @@
+import itertools
+import threading
+import time
+import typing
+import weakref
+from dataclasses import dataclass
+
+from monitored_ioloop.monitoring import IoLoopInnerState
+from monitored_ioloop.utilization import LoopUtilization
+
+
+class MonitoredLoop(typing.Protocol):
+    """
+    The interface the registry uses, implemented by both MonitoredSelectorEventLoop and MonitoredUvloopEventLoop.
+    """
+
+    @property
+    def ioloop_state(self) -> IoLoopInnerState: ...
+
+    def loop_utilization(self) -> LoopUtilization: ...
+
+    def is_running(self) -> bool: ...
+
+    def is_closed(self) -> bool: ...
+
+
+@dataclass
+class LoopSnapshot:
+    """
+    The state of a single registered loop at the time of the snapshot.
+    """
+
+    """
+    The loop's process unique id, assigned when it was created (see IoLoopInnerState.loop_id).
+    """
+    loop_id: int
+
+    """
+    The name of the thread that runs (or last ran) the loop, None if it never ran.
+    """
+    thread_name: typing.Optional[str]
+
+    running: bool
+    closed: bool
+
+    """
+    The amount of handles in the loop.
+    """
+    handles_count: int
+
+    """
+    The loop lag of the last (or currently running) callback, or, while a callback is running,
+    how long it has been blocking the loop if that is longer (the lag the next callback has at least).
+    The loops only track it once they were in a snapshot (or with the track_current_callback monitoring option),
+    until then it is 0.
+    """
+    last_loop_lag: float
+
+    """
+    The loop's cumulative utilization counters, compare two snapshots with utilization_between
+    for the utilization in between.
+    """
+    utilization: LoopUtilization
+
+
+def _last_loop_lag(ioloop_state: IoLoopInnerState, now: float) -> float:
+    last_loop_lag = ioloop_state.current_callback_loop_lag
+    if ioloop_state.current_callback is None:
+        return last_loop_lag
+    # A callback that doesn't return (a stall) doesn't show up in the loop lag until the next callback runs.
+    return max(last_loop_lag, now - ioloop_state.current_callback_started_at)
+
+
+class LoopRegistry:
+    """
+    A process wide registry of the monitored loops, every monitored loop registers itself in loop_registry when
+    it is created. The loops are weakly referenced, a loop is dropped from the registry once it is garbage collected.
+
+    The registry can be read from any thread, so a single exporter can cover all the loops of the process
+    (for example a main uvicorn loop and background loops running in threads).
+    Reading a loop's state from another thread is lock free, the values may be a callback apart.
+
+    Usage:
+    >>> for loop_snapshot in loop_registry.snapshot():
+    >>>     print(loop_snapshot.thread_name, loop_snapshot.handles_count, loop_snapshot.utilization.utilization)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop_ids = itertools.count(1)
+        self._loops: "weakref.WeakValueDictionary[int, MonitoredLoop]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    def register(self, loop: MonitoredLoop) -> int:
+        """
+        Register the loop, returning its loop id.
+        """
+        with self._lock:
+            loop_id = next(self._loop_ids)
+            self._loops[loop_id] = loop
+        return loop_id
+
+    def loops(self) -> typing.Dict[int, MonitoredLoop]:
+        """
+        The registered loops that are still alive, by their loop id.
+        """
+        with self._lock:
+            return dict(self._loops.items())
+
+    def snapshot(self) -> typing.List[LoopSnapshot]:
+        """
+        The state of all the registered loops, ordered by their loop id.
+        """
+        loops = sorted(self.loops().items())
+        for _, loop in loops:
+            loop.ioloop_state.track_current_callback = True
+        now = time.perf_counter()
+        return [
+            LoopSnapshot(
+                loop_id=loop_id,
+                thread_name=loop.ioloop_state.thread_name,
+                running=loop.is_running(),
+                closed=loop.is_closed(),
+                handles_count=loop.ioloop_state.handles_count,
+                last_loop_lag=_last_loop_lag(loop.ioloop_state, now),
+                utilization=loop.loop_utilization(),
+            )
+            for loop_id, loop in loops
+        ]
+
+
+loop_registry = LoopRegistry()
@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LoopUtilization:
+    """
+    Cumulative event loop utilization counters, similar to Node's performance.eventLoopUtilization().
+    idle_time is the time the running loop spent waiting for I/O or timers, active_time the time it spent
+    doing anything else (running callbacks, processing I/O events). Both are in seconds and only grow
+    while the loop is running, the time between run_forever / run_until_complete calls is not counted.
+
+    The counters can be read from any thread. How accurate they are depends on the loop:
+    the asyncio loop times its selector, so idle_time is the actual time spent polling for I/O and timers.
+    uvloop polls inside libuv, so its active_time is only approximated by the monitored callbacks' wall time,
+    the I/O callbacks uvloop calls directly (for example protocol.data_received) are counted as idle,
+    under-reporting the utilization of loops busy with protocol I/O.
+
+    Usage:
+    >>> earlier = loop.loop_utilization()
+    >>> ...
+    >>> utilization_between(earlier, loop.loop_utilization())
+    """
+
+    idle_time: float
+    active_time: float
+
+    @property
+    def utilization(self) -> float:
+        """
+        The fraction (0 to 1) of the running time the loop was active.
+        """
+        return _utilization(self.idle_time, self.active_time)
+
+
+def utilization_between(earlier: LoopUtilization, later: LoopUtilization) -> float:
+    """
+    The fraction (0 to 1) of the time the loop was active between two readings of its counters.
+    """
+    return _utilization(
+        later.idle_time - earlier.idle_time, later.active_time - earlier.active_time
+    )
+
+
+def _utilization(idle_time: float, active_time: float) -> float:
+    running_time = idle_time + active_time
+    if running_time <= 0:
+        return 0.0
+    return active_time / running_time
@@ -0,0 +1,167 @@
+import sys
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from logging import getLogger
+from types import FrameType
+
+from monitored_ioloop.formatting_utils import aggregation_callback_name
+from monitored_ioloop.monitoring import IoLoopInnerState, LazyCallbackPrettyName
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class LoopStall(LazyCallbackPrettyName):
+    """
+    A stack sample of a loop thread that is stalled by a monitored callback, received by the on_stall callback.
+    """
+
+    """
+    The time the callback has been running so far.
+    """
+    stalled_for: float
+
+    """
+    The loop thread's stack in collapsed stack format (root first, frames separated by ';').
+    """
+    stack: str
+
+    """
+    The ident of the stalled loop thread.
+    """
+    thread_id: int
+
+    """
+    The pretty name of the stalled callback, see IoLoopMonitorState.callback_pretty_name.
+    The watchdog resolves it lazily, on the thread that reads it.
+    """
+    callback_pretty_name: str
+
+    """
+    A cheap, bounded cardinality name of the stalled callback (see aggregation_callback_name),
+    the key to aggregate stalls by, unlike callback_pretty_name it doesn't contain ids or line numbers.
+    """
+    callback_name: str
+
+
+def collapse_stack(frame: typing.Optional[FrameType]) -> str:
+    """
+    Format a stack in collapsed stack format (as used by flamegraph.pl and speedscope),
+    every frame is formatted as "function (filename:line)", from the root frame to the given one.
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class LoopWatchdog:
+    """
+    A background thread that notices when a monitored callback runs longer than stall_threshold, and samples
+    the loop thread's stack (via sys._current_frames()) every sample_interval seconds while it is still stalled.
+    The callback_wall_time is only known once a callback returns, by then the stack that blocked the loop is gone,
+    and a callback that never returns is never reported at all.
+
+    The sampled stacks are attached to the callback's IoLoopMonitorState.stall_stacks (up to max_stacks_per_callback
+    of them), and every sample is passed to on_stall right away, on the watchdog thread.
+    A watchdog can watch several loops, the loops register themselves while they are running.
+
+    Usage:
+    >>> with LoopWatchdog(stall_threshold=0.5, on_stall=print) as watchdog:
+    ...     factory = monitored_asyncio_loop_factory(monitor_callback, watchdog=watchdog)
+    ...     asyncio.run(main(), loop_factory=factory)
+    """
+
+    def __init__(
+        self,
+        stall_threshold: float = 0.1,
+        sample_interval: float = 0.01,
+        on_stall: typing.Optional[typing.Callable[[LoopStall], None]] = None,
+        max_stacks_per_callback: int = 100,
+    ):
+        if sample_interval <= 0:
+            raise ValueError("sample_interval must be positive.")
+        self.stall_threshold = stall_threshold
+        self.sample_interval = sample_interval
+        self.max_stacks_per_callback = max_stacks_per_callback
+        self._on_stall = on_stall
+        self._watched: typing.Dict[int, IoLoopInnerState] = {}
+        self._watched_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sample_periodically,
+            name="monitored-ioloop-watchdog",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def watch(self, ioloop_state: IoLoopInnerState) -> None:
+        """
+        Start watching a loop, called by the loop when it starts running.
+        """
+        with self._watched_lock:
+            self._watched[id(ioloop_state)] = ioloop_state
+
+    def unwatch(self, ioloop_state: IoLoopInnerState) -> None:
+        """
+        Stop watching a loop, called by the loop when it stops running.
+        """
+        with self._watched_lock:
+            self._watched.pop(id(ioloop_state), None)
+
+    def _sample_periodically(self) -> None:
+        while not self._closed.wait(self.sample_interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        with self._watched_lock:
+            watched = list(self._watched.values())
+        frames: typing.Optional[typing.Dict[int, FrameType]] = None
+        now = time.perf_counter()
+        for ioloop_state in watched:
+            callback = ioloop_state.current_callback
+            if callback is None or ioloop_state.thread_id is None:
+                continue
+            stalled_for = now - ioloop_state.current_callback_started_at
+            if stalled_for < self.stall_threshold:
+                continue
+            if frames is None:
+                frames = sys._current_frames()
+            stack = collapse_stack(frames.get(ioloop_state.thread_id))
+            if ioloop_state.current_callback is not callback:
+                # The callback returned while the stack was sampled, the stack may belong to another one.
+                continue
+            callback.add_stall_stack(stack, self.max_stacks_per_callback)
+            if self._on_stall is None:
+                continue
+            loop_stall = LoopStall(
+                stalled_for=stalled_for,
+                stack=stack,
+                thread_id=ioloop_state.thread_id,
+                callback_pretty_name="",
+                callback_name=aggregation_callback_name(callback.__wrapped__),
+            )
+            loop_stall.resolve_callback_pretty_name_lazily(
+                callback._resolve_pretty_name
+            )
+            try:
+                self._on_stall(loop_stall)
+            except Exception:
+                logger.warning("On stall callback failed.", exc_info=True)
+
+    def close(self, timeout: typing.Optional[float] = None) -> None:
+        """
+        Stop the watchdog thread.
+        """
+        self._closed.set()
+        self._thread.join(timeout)
+
+    def __enter__(self) -> "LoopWatchdog":
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        self.close()
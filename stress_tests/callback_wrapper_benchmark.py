@@ -0,0 +1,115 @@
+"""
+Micro benchmark of the per callback wrapper, comparing the slotted MonitoredCallbackWrapper
+with the wrapt.ObjectProxy based wrapper it replaced (kept here for reference only).
+It measures the allocation size of a wrapper and the time it takes to wrap and run a callback.
+"""
+
+import time
+import timeit
+import tracemalloc
+import typing
+from asyncio import Handle
+
+import click
+import wrapt
+
+from monitored_ioloop.monitoring import (
+    IoLoopInnerState,
+    IoLoopMonitorState,
+    MonitoredCallbackWrapper,
+    wrap_callback_with_monitoring,
+)
+
+
+class LegacyMonitoredCallbackWrapper(wrapt.ObjectProxy):  # type: ignore
+    def __init__(
+        self,
+        callback: typing.Callable[..., typing.Any],
+        monitor_callback: typing.Callable[[IoLoopMonitorState], None],
+        io_loop_state: IoLoopInnerState,
+    ):
+        super().__init__(callback)
+        self._self_original_callback = callback
+        self._self_monitor_callback = monitor_callback
+        self._self_ioloop_state = io_loop_state
+        self._self_added_to_loop_time = time.perf_counter()
+        self._self_handle: typing.Optional[Handle] = None
+
+    def __call__(self, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        loop_lag = time.perf_counter() - self._self_added_to_loop_time
+        start_wall_time = time.perf_counter()
+        response = self._self_original_callback(*args, **kwargs)
+        self._self_ioloop_state.decrease_handles_count(1)
+        wall_duration = time.perf_counter() - start_wall_time
+        self._self_monitor_callback(
+            IoLoopMonitorState(
+                callback_wall_time=wall_duration,
+                loop_handles_count=self._self_ioloop_state.handles_count,
+                loop_lag=loop_lag,
+                callback_pretty_name="",
+            )
+        )
+        return response
+
+
+def _callback() -> None:
+    pass
+
+
+def _monitor_callback(_state: IoLoopMonitorState) -> None:
+    pass
+
+
+def _wrap_legacy(state: IoLoopInnerState) -> LegacyMonitoredCallbackWrapper:
+    state.increase_handles_count(1)
+    return LegacyMonitoredCallbackWrapper(_callback, _monitor_callback, state)
+
+
+def _wrap(state: IoLoopInnerState) -> MonitoredCallbackWrapper:
+    return wrap_callback_with_monitoring(_callback, _monitor_callback, state)
+
+
+def _allocated_bytes_per_wrapper(
+    wrap: typing.Callable[[IoLoopInnerState], typing.Any], count: int
+) -> float:
+    state = IoLoopInnerState(handles_count=0)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    wrappers = [wrap(state) for _ in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding the wrappers is allocated as well, don't count it.
+    return (after - before) / len(wrappers) - 8
+
+
+def _nanoseconds_per_call(
+    wrap: typing.Callable[[IoLoopInnerState], typing.Any],
+    count: int,
+    **monitoring_options: typing.Any,
+) -> float:
+    state = IoLoopInnerState(handles_count=0, **monitoring_options)
+    seconds = min(timeit.repeat(lambda: wrap(state)(), number=count, repeat=5))
+    return seconds / count * 1e9
+
+
+@click.command()
+@click.option("--count", default=100_000, help="Wrappers to create per measurement")
+def run(count: int) -> None:
+    click.echo(f"{'wrapper':<40}{'bytes':>10}{'ns/call':>12}")
+    for wrapper_name, wrap in (
+        ("wrapt.ObjectProxy (legacy)", _wrap_legacy),
+        ("slotted MonitoredCallbackWrapper", _wrap),
+    ):
+        click.echo(
+            f"{wrapper_name:<40}"
+            f"{_allocated_bytes_per_wrapper(wrap, count):>10.0f}"
+            f"{_nanoseconds_per_call(wrap, count):>12.0f}"
+        )
+    click.echo(
+        f"{'slotted, under slow_callback_threshold':<40}{'':>10}"
+        f"{_nanoseconds_per_call(_wrap, count, slow_callback_threshold=1):>12.0f}"
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -45,7 +45,7 @@ def set_ioloop_policy(monitor_type: IOLoopType) -> None:
     if monitor_type in (IOLoopType.monitored_uvloop, IOLoopType.monitored_asyncio):
         asyncio.set_event_loop_policy(
             typing.cast(typing.Type[BaseMonitoredEventLoopPolicy], ioloop_policy)(
-                monitor
+                monitor, slow_callback_threshold=0.1
             )
         )
     else:
@@ -1,5 +1,7 @@
 import asyncio
 import dataclasses
+import time
+import types
 import typing
 from asyncio import AbstractEventLoop
 from enum import Enum
@@ -12,11 +14,13 @@ from monitored_ioloop.monitored_asyncio import (
     monitored_asyncio_loop_factory,
 )
 from monitored_ioloop.monitored_ioloop_base import BaseMonitoredEventLoopPolicy
+from monitored_ioloop.monitoring import IoLoopMonitorState, MonitoringOptions
 from monitored_ioloop.monitored_uvloop import (
     MonitoredUvloopEventLoopPolicy,
     monitored_uvloop_loop_factory,
 )
-from tests.utils import assert_expected_loop_type
+from monitored_ioloop import monitoring
+from tests.utils import FakeClock, assert_expected_loop_type
 from unittest.mock import Mock
 
 
@@ -39,6 +43,16 @@ class TestCaseContext:
     mock: Mock
 
 
+def create_loop_factory(
+    loop_type: LoopType,
+    monitor_callback: typing.Optional[typing.Callable[[IoLoopMonitorState], None]],
+    **monitoring_options: typing.Unpack[MonitoringOptions],
+) -> typing.Callable[[], AbstractEventLoop]:
+    if loop_type == LoopType.ASYNCIO:
+        return monitored_asyncio_loop_factory(monitor_callback, **monitoring_options)
+    return monitored_uvloop_loop_factory(monitor_callback, **monitoring_options)
+
+
 @pytest.fixture(params=[LoopType.ASYNCIO, LoopType.UVLOOP])
 def loop_type(request: pytest.FixtureRequest) -> LoopType:
     return typing.cast(LoopType, request.param)
@@ -60,13 +74,12 @@ def test_case_context(
     if loop_type == LoopType.ASYNCIO:
         if api_type == InterfaceType.POLICY:
             policy = MonitoredAsyncIOEventLoopPolicy(mock)
-        else:
-            factory = monitored_asyncio_loop_factory(mock)
     else:
         if api_type == InterfaceType.POLICY:
             policy = MonitoredUvloopEventLoopPolicy(mock)
-        else:
-            factory = monitored_uvloop_loop_factory(mock)
+
+    if api_type == InterfaceType.FACTORY:
+        factory = create_loop_factory(loop_type, mock)
 
     yield TestCaseContext(
         loop_type=loop_type,
@@ -84,3 +97,22 @@ def test_case_context(
 
     asyncio.set_event_loop_policy(None)
     asyncio.set_event_loop(None)
+
+
+@pytest.fixture
+def fake_clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """
+    Replaces the clocks the callbacks are timed with, the timer callbacks' lateness still uses time.monotonic.
+    """
+    clock = FakeClock()
+    monkeypatch.setattr(
+        monitoring,
+        "time",
+        types.SimpleNamespace(
+            perf_counter=clock.perf_counter,
+            thread_time=clock.thread_time,
+            monotonic=time.monotonic,
+            time=time.time,
+        ),
+    )
+    return clock
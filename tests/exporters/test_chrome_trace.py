@@ -0,0 +1,139 @@
+import asyncio
+import json
+import threading
+import typing
+from pathlib import Path
+
+from monitored_ioloop.exporters.chrome_trace import (
+    LOOP_LAG_EVENT_NAME,
+    ChromeTraceWriter,
+)
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import busy_wait
+
+
+def blocking_callback(block_for: float) -> None:
+    busy_wait(block_for)
+
+
+async def blocking_coroutine(block_for: float) -> None:
+    busy_wait(block_for)
+
+
+async def block_twice(block_for: float) -> None:
+    loop = asyncio.get_running_loop()
+    loop.call_soon(blocking_callback, block_for)
+    loop.call_soon(blocking_callback, block_for)
+    await asyncio.sleep(block_for * 3)
+
+
+def _load_trace(path: Path) -> typing.List[typing.Dict[str, typing.Any]]:
+    return typing.cast(
+        typing.List[typing.Dict[str, typing.Any]], json.loads(path.read_text())
+    )
+
+
+def test_callbacks_are_written_as_complete_events(
+    loop_type: LoopType, tmp_path: Path
+) -> None:
+    trace_path = tmp_path / "loop.trace.json"
+    with ChromeTraceWriter(str(trace_path), flush_interval=0.05) as trace_writer:
+        factory = create_loop_factory(loop_type, trace_writer)
+        asyncio.run(block_twice(0.1), loop_factory=factory)
+
+    trace_events = _load_trace(trace_path)
+    thread_names = [event for event in trace_events if event["ph"] == "M"]
+    assert [event["args"]["name"] for event in thread_names] == [
+        threading.current_thread().name
+    ]
+
+    blocking_events = [
+        event
+        for event in trace_events
+        if event["ph"] == "X" and event["name"] == "blocking_callback"
+    ]
+    assert len(blocking_events) == 2
+    first, second = sorted(blocking_events, key=lambda event: event["ts"])
+    assert 100_000 <= first["dur"] < 300_000
+    # The second callback waited for the first one.
+    assert second["ts"] >= first["ts"] + first["dur"]
+    assert second["args"]["loop_lag"] >= 0.1
+
+    lag_slices = [
+        event
+        for event in trace_events
+        if event["name"] == LOOP_LAG_EVENT_NAME
+        and event["ph"] == "b"
+        and event["args"]["callback"] == second["name"]
+    ]
+    assert len(lag_slices) == 1
+    begin = lag_slices[0]
+    end = next(
+        event
+        for event in trace_events
+        if event["ph"] == "e" and event["id"] == begin["id"]
+    )
+    assert end["ts"] == second["ts"]
+    assert begin["ts"] < first["ts"] + first["dur"]
+
+
+def test_unclosed_trace_is_written_on_flush(tmp_path: Path) -> None:
+    trace_path = tmp_path / "loop.trace.json"
+    trace_writer = ChromeTraceWriter(str(trace_path))
+    factory = create_loop_factory(LoopType.ASYNCIO, trace_writer)
+    asyncio.run(asyncio.sleep(0), loop_factory=factory)
+    trace_writer.flush()
+
+    # The viewers accept an unclosed JSON array.
+    assert json.loads(trace_path.read_text() + "]")
+    trace_writer.close()
+    assert json.loads(trace_path.read_text())
+
+
+def test_events_are_named_by_the_callback_name(
+    loop_type: LoopType, tmp_path: Path
+) -> None:
+    trace_path = tmp_path / "loop.trace.json"
+    with ChromeTraceWriter(str(trace_path), flush_interval=60) as trace_writer:
+        factory = create_loop_factory(
+            loop_type, trace_writer, slow_callback_threshold=0.05
+        )
+        asyncio.run(blocking_coroutine(0.1), loop_factory=factory)
+
+    (callback_event,) = [
+        event for event in _load_trace(trace_path) if event["ph"] == "X"
+    ]
+    # Not the Task's repr, that describes a finished task once the step returned.
+    assert callback_event["name"] == "blocking_coroutine"
+
+
+def test_events_are_dropped_when_the_queue_is_full(tmp_path: Path) -> None:
+    trace_path = tmp_path / "loop.trace.json"
+    with ChromeTraceWriter(
+        str(trace_path), flush_interval=60, capacity=1
+    ) as trace_writer:
+        factory = create_loop_factory(
+            LoopType.ASYNCIO, trace_writer, slow_callback_threshold=0.05
+        )
+        asyncio.run(block_twice(0.1), loop_factory=factory)
+
+    assert trace_writer.dropped_count == 1
+    assert len([event for event in _load_trace(trace_path) if event["ph"] == "X"]) == 1
+
+
+def test_events_are_written_by_the_writer_thread(tmp_path: Path) -> None:
+    trace_path = tmp_path / "loop.trace.json"
+    written_by: typing.Set[str] = set()
+    with ChromeTraceWriter(str(trace_path), flush_interval=0.01) as trace_writer:
+        write_pending = trace_writer._write_pending
+
+        def recording_write_pending() -> None:
+            if trace_writer._events:
+                written_by.add(threading.current_thread().name)
+            write_pending()
+
+        trace_writer._write_pending = recording_write_pending  # type: ignore[method-assign]
+        factory = create_loop_factory(LoopType.ASYNCIO, trace_writer)
+        asyncio.run(asyncio.sleep(0.1), loop_factory=factory)
+
+    assert written_by == {"monitored-ioloop-chrome-trace"}
@@ -0,0 +1,146 @@
+import asyncio
+import typing
+
+import pytest
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from monitored_ioloop.exporters.cardinality import OTHER_NAME
+from monitored_ioloop.exporters.otel import (
+    SLOW_CALLBACK_EVENT_NAME,
+    LoopMetricsInstruments,
+    SlowCallbackSpanEvents,
+)
+from monitored_ioloop.monitoring import LoopMetricsCollector
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import busy_wait
+
+
+async def blocking_coroutine(block_for: float) -> None:
+    busy_wait(block_for)
+
+
+@pytest.fixture
+def metrics_collector() -> LoopMetricsCollector:
+    return LoopMetricsCollector()
+
+
+@pytest.fixture
+def metric_reader() -> InMemoryMetricReader:
+    return InMemoryMetricReader()
+
+
+def _instruments(
+    metrics_collector: LoopMetricsCollector,
+    metric_reader: InMemoryMetricReader,
+    **kwargs: typing.Any,
+) -> LoopMetricsInstruments:
+    meter = MeterProvider(metric_readers=[metric_reader]).get_meter("test")
+    return LoopMetricsInstruments(metrics_collector, meter, **kwargs)
+
+
+def _values(
+    metric_reader: InMemoryMetricReader,
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """
+    The collected values as metric name -> "name" (or "loop") attribute -> value.
+    """
+    values: typing.Dict[str, typing.Dict[str, float]] = {}
+    metrics_data = metric_reader.get_metrics_data()
+    assert metrics_data is not None
+    for resource_metrics in metrics_data.resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    attributes = point.attributes or {}
+                    label = attributes.get("name", attributes.get("loop"))
+                    values.setdefault(metric.name, {})[str(label)] = point.value  # type: ignore[union-attr]
+    return values
+
+
+def test_loop_metrics_are_observed_at_collection_time(
+    loop_type: LoopType,
+    metrics_collector: LoopMetricsCollector,
+    metric_reader: InMemoryMetricReader,
+) -> None:
+    _instruments(metrics_collector, metric_reader)
+    factory = create_loop_factory(loop_type, None, metrics_collector=metrics_collector)
+    asyncio.run(blocking_coroutine(0.2), loop_factory=factory)
+
+    values = _values(metric_reader)
+    assert (
+        values["monitored_ioloop.callback_wall_time.count"]["blocking_coroutine"] == 1
+    )
+    assert (
+        0.2 <= values["monitored_ioloop.callback_wall_time"]["blocking_coroutine"] < 0.5
+    )
+    assert "blocking_coroutine" in values["monitored_ioloop.loop_lag"]
+
+
+def test_names_beyond_top_k_are_merged_into_other(
+    metrics_collector: LoopMetricsCollector, metric_reader: InMemoryMetricReader
+) -> None:
+    _instruments(metrics_collector, metric_reader, prefix="loop", top_k=2)
+    for name, samples in (("first", 3), ("second", 2), ("third", 1), ("fourth", 1)):
+        metrics_collector.observe("callback_wall_time", name, 0.01, samples)
+
+    counts = _values(metric_reader)["loop.callback_wall_time.count"]
+    assert counts == {"first": 3, "second": 2, OTHER_NAME: 2}
+
+    # Every collection reads a new snapshot.
+    metrics_collector.observe("callback_wall_time", "third", 0.01, 10)
+    counts = _values(metric_reader)["loop.callback_wall_time.count"]
+    assert counts == {"first": 3, "second": 2, OTHER_NAME: 12}
+
+
+def test_loop_handles_count_is_observed(
+    metrics_collector: LoopMetricsCollector, metric_reader: InMemoryMetricReader
+) -> None:
+    instruments = _instruments(metrics_collector, metric_reader)
+
+    async def observe_handles() -> typing.Dict[str, float]:
+        instruments.observe_loop(asyncio.get_running_loop(), "main")
+        for _ in range(3):
+            asyncio.get_running_loop().call_soon(lambda: None)
+        return _values(metric_reader)["monitored_ioloop.handles"]
+
+    factory = create_loop_factory(LoopType.ASYNCIO, None)
+    handles = asyncio.run(observe_handles(), loop_factory=factory)
+    assert handles["main"] >= 3
+
+    loop = asyncio.new_event_loop()
+    with pytest.raises(ValueError):
+        instruments.observe_loop(loop)
+    loop.close()
+
+
+def test_slow_callbacks_add_span_events(loop_type: LoopType) -> None:
+    span_exporter = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    tracer = tracer_provider.get_tracer("test")
+
+    async def handle_request(block_for: float) -> None:
+        with tracer.start_as_current_span(f"request blocking {block_for}"):
+            busy_wait(block_for)
+            await asyncio.sleep(0)
+
+    async def main() -> None:
+        await asyncio.gather(handle_request(0.2), handle_request(0))
+
+    factory = create_loop_factory(loop_type, SlowCallbackSpanEvents(threshold=0.1))
+    asyncio.run(main(), loop_factory=factory)
+
+    events = {
+        span.name: [event.name for event in span.events]
+        for span in span_exporter.get_finished_spans()
+    }
+    assert events == {
+        "request blocking 0.2": [SLOW_CALLBACK_EVENT_NAME],
+        "request blocking 0": [],
+    }
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+from monitored_ioloop.exporters.cardinality import OTHER_NAME
+from monitored_ioloop.exporters.prometheus import LoopMetricsPrometheusCollector
+from monitored_ioloop.monitoring import LoopMetricsCollector
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import busy_wait
+
+
+async def blocking_coroutine(block_for: float) -> None:
+    busy_wait(block_for)
+
+
+@pytest.fixture
+def metrics_collector() -> LoopMetricsCollector:
+    return LoopMetricsCollector()
+
+
+def _registry(collector: LoopMetricsPrometheusCollector) -> CollectorRegistry:
+    registry = CollectorRegistry()
+    registry.register(collector)
+    return registry
+
+
+def test_loop_metrics_are_exported_at_scrape_time(
+    loop_type: LoopType, metrics_collector: LoopMetricsCollector
+) -> None:
+    registry = _registry(LoopMetricsPrometheusCollector(metrics_collector))
+    factory = create_loop_factory(loop_type, None, metrics_collector=metrics_collector)
+    asyncio.run(blocking_coroutine(0.2), loop_factory=factory)
+
+    labels = {"name": "blocking_coroutine"}
+    metric = "monitored_ioloop_callback_wall_time_seconds"
+    assert registry.get_sample_value(f"{metric}_count", labels) == 1
+    assert registry.get_sample_value(f"{metric}_bucket", {**labels, "le": "0.1"}) == 0
+    assert registry.get_sample_value(f"{metric}_bucket", {**labels, "le": "0.5"}) == 1
+    assert registry.get_sample_value(f"{metric}_bucket", {**labels, "le": "+Inf"}) == 1
+    assert registry.get_sample_value("monitored_ioloop_loop_lag_seconds_count", labels)
+
+
+def test_names_beyond_top_k_are_merged_into_other(
+    metrics_collector: LoopMetricsCollector,
+) -> None:
+    registry = _registry(
+        LoopMetricsPrometheusCollector(metrics_collector, prefix="loop", top_k=2)
+    )
+    for name, samples in (("first", 3), ("second", 2), ("third", 1), ("fourth", 1)):
+        metrics_collector.observe("callback_wall_time", name, 0.01, samples)
+
+    def count(name: str) -> float | None:
+        return registry.get_sample_value(
+            "loop_callback_wall_time_seconds_count", {"name": name}
+        )
+
+    assert (count("first"), count("second"), count(OTHER_NAME)) == (3, 2, 2)
+    assert count("third") is None
+
+    # Exported names keep their series, even once other names have more samples.
+    metrics_collector.observe("callback_wall_time", "third", 0.01, 10)
+    assert (count("first"), count("second"), count(OTHER_NAME)) == (3, 2, 12)
+
+
+def test_count_metrics_are_not_in_seconds(
+    metrics_collector: LoopMetricsCollector,
+) -> None:
+    registry = _registry(LoopMetricsPrometheusCollector(metrics_collector))
+    metrics_collector.observe(LoopMetricsCollector.TICK_CALLBACKS_RUN, "loop", 7)
+    assert (
+        registry.get_sample_value(
+            "monitored_ioloop_tick_callbacks_run_bucket", {"name": "loop", "le": "10"}
+        )
+        == 1
+    )
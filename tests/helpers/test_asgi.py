@@ -0,0 +1,149 @@
+import asyncio
+import typing
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from monitored_ioloop.helpers.asgi import (
+    LoopLagMiddleware,
+    Message,
+    Receive,
+    Scope,
+    Send,
+)
+from monitored_ioloop.monitoring import LoopMetricsCollector
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import _assert_monitor_result, busy_wait
+
+
+async def blocking_child(block_for: float) -> None:
+    busy_wait(block_for)
+
+
+async def raw_asgi_app(scope: Scope, receive: Receive, send: Send) -> None:
+    busy_wait(0.05)
+    await asyncio.sleep(0)
+    await asyncio.create_task(blocking_child(0.05))
+    busy_wait(0.05)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    busy_wait(0.1)
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def call_while_the_loop_is_blocked(app: LoopLagMiddleware) -> None:
+    sent: typing.List[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/users/1234"}
+    request = asyncio.create_task(app(scope, receive, send))
+    busy_wait(0.1)
+    await request
+    assert [message["type"] for message in sent] == [
+        "http.response.start",
+        "http.response.body",
+    ]
+
+
+def test_queueing_delay_and_loop_time_until_response_start(
+    loop_type: LoopType,
+) -> None:
+    collector = LoopMetricsCollector()
+    app = LoopLagMiddleware(raw_asgi_app, collector)
+    asyncio.run(
+        call_while_the_loop_is_blocked(app),
+        loop_factory=create_loop_factory(loop_type, None, track_current_callback=True),
+    )
+
+    histograms = collector.snapshot().histograms
+    (name,) = histograms[LoopMetricsCollector.REQUEST_QUEUEING_DELAY]
+    assert name == "[GET] <unmatched route>"
+    _assert_monitor_result(
+        0.1, histograms[LoopMetricsCollector.REQUEST_QUEUEING_DELAY][name].max
+    )
+    # The time after the response started isn't counted.
+    _assert_monitor_result(
+        0.15, histograms[LoopMetricsCollector.REQUEST_LOOP_TIME][name].max
+    )
+
+
+def test_nothing_is_recorded_on_loops_that_are_not_monitored() -> None:
+    collector = LoopMetricsCollector()
+    app = LoopLagMiddleware(raw_asgi_app, collector)
+    asyncio.run(call_while_the_loop_is_blocked(app))
+    assert collector.snapshot().histograms == {}
+
+
+async def get(app: LoopLagMiddleware, path: str) -> httpx.Response:
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        return await client.get(path)
+
+
+def test_requests_are_named_by_their_route_template(loop_type: LoopType) -> None:
+    fastapi_app = FastAPI()
+
+    @fastapi_app.get("/users/{user_id}")
+    async def user(user_id: str) -> str:
+        return user_id
+
+    collector = LoopMetricsCollector()
+    app = LoopLagMiddleware(fastapi_app, collector)
+    for path in ("/users/1", "/users/2"):
+        response = asyncio.run(
+            get(app, path),
+            loop_factory=create_loop_factory(
+                loop_type, None, track_current_callback=True
+            ),
+        )
+        assert response.status_code == 200
+
+    loop_times = collector.snapshot().histograms[LoopMetricsCollector.REQUEST_LOOP_TIME]
+    assert loop_times.keys() == {"[GET] /users/{user_id}"}
+    assert loop_times["[GET] /users/{user_id}"].count == 2
+
+
+async def lifespan_startup(app: LoopLagMiddleware) -> None:
+    async def receive() -> Message:
+        return {"type": "lifespan.startup"}
+
+    async def send(message: Message) -> None:
+        pass
+
+    async def lifespan_app(scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+
+    await LoopLagMiddleware(lifespan_app, app._metrics_collector)(
+        {"type": "lifespan"}, receive, send
+    )
+
+
+async def call_twice(app: LoopLagMiddleware, lifespan: bool) -> None:
+    if lifespan:
+        await lifespan_startup(app)
+    await call_while_the_loop_is_blocked(app)
+    await call_while_the_loop_is_blocked(app)
+
+
+@pytest.mark.parametrize(("lifespan", "recorded_requests"), [(False, 1), (True, 2)])
+def test_tracking_is_enabled_by_the_lifespan_or_the_first_request(
+    loop_type: LoopType, lifespan: bool, recorded_requests: int
+) -> None:
+    collector = LoopMetricsCollector()
+    app = LoopLagMiddleware(raw_asgi_app, collector)
+    asyncio.run(
+        call_twice(app, lifespan), loop_factory=create_loop_factory(loop_type, None)
+    )
+
+    (queueing_delays,) = (
+        collector.snapshot()
+        .histograms[LoopMetricsCollector.REQUEST_QUEUEING_DELAY]
+        .values()
+    )
+    assert queueing_delays.count == recorded_requests
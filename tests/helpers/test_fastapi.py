@@ -1,21 +1,39 @@
 import asyncio
+from unittest.mock import patch
 
 import pytest
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, HTTPException
 from fastapi.testclient import TestClient
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
-from monitored_ioloop.helpers.fastapi import MonitoredIOLoopMiddleware
+from monitored_ioloop.attribution import current_cost_label
+from monitored_ioloop.helpers.fastapi import (
+    UNMATCHED_ROUTE_NAME,
+    MonitoredIOLoopMiddleware,
+)
 
 
 @pytest.fixture
 def fastapi_app() -> FastAPI:
     app = FastAPI()
 
+    mounted_router = APIRouter()
+
+    @mounted_router.get("/items/{item_id}")
+    async def mounted_route() -> str:
+        return await test_route()
+
     @app.get("/ping")
     async def ping() -> str:
         return "ping"
 
+    async def child_task_cost_label() -> str | None:
+        return current_cost_label()
+
+    @app.get("/cost_label")
+    async def cost_label_route() -> str | None:
+        return await asyncio.create_task(child_task_cost_label())
+
     @app.get("/simple_route")
     @app.get("/nested/route")
     @app.get("/query_parameters")
@@ -29,6 +47,7 @@ def fastapi_app() -> FastAPI:
             status_code=HTTP_500_INTERNAL_SERVER_ERROR, detail="No current task."
         )
 
+    app.mount("/mounted", FastAPI(routes=mounted_router.routes))
     return app
 
 
@@ -86,16 +105,16 @@ def test_monitored_async_io_middleware__path_parameters_task_name(
 ) -> None:
     response = test_client.get("/path/parameters/test")
     assert response.status_code == 200, response.text
-    assert response.json() == "[GET] /path/parameters/test"
+    assert response.json() == "[GET] /path/parameters/{_path_parameter}"
 
 
 @pytest.mark.usefixtures("default_monitoring_middleware")
-def test_monitored_async_io_middleware__path_parameters_with_numbers_are_masked_task_name(
+def test_monitored_async_io_middleware__path_parameters_with_numbers_use_the_route_template(
     test_client: TestClient,
 ) -> None:
     response = test_client.get("/path/parameters/1234")
     assert response.status_code == 200, response.text
-    assert response.json() == "[GET] /path/parameters/_"
+    assert response.json() == "[GET] /path/parameters/{_path_parameter}"
 
 
 @pytest.mark.usefixtures("default_monitoring_middleware")
@@ -105,3 +124,59 @@ def test_monitored_async_io_middleware__post_method_task_name(
     response = test_client.post("/post/method")
     assert response.status_code == 200, response.text
     assert response.json() == "[POST] /post/method"
+
+
+@pytest.mark.usefixtures("default_monitoring_middleware")
+def test_monitored_async_io_middleware__cost_label_propagates_to_child_tasks(
+    test_client: TestClient,
+) -> None:
+    response = test_client.get("/cost_label")
+    assert response.status_code == 200, response.text
+    assert response.json() == "[GET] /cost_label"
+
+
+@pytest.mark.usefixtures("default_monitoring_middleware")
+def test_monitored_async_io_middleware__mounted_route_task_name(
+    test_client: TestClient,
+) -> None:
+    response = test_client.get("/mounted/items/a1b2c3")
+    assert response.status_code == 200, response.text
+    assert response.json() == "[GET] /mounted/items/{item_id}"
+
+
+def test_route_names_are_cached_per_path(fastapi_app: FastAPI) -> None:
+    middleware = MonitoredIOLoopMiddleware(fastapi_app)
+    scopes = [
+        {"type": "http", "app": fastapi_app, "method": "GET", "path": path}
+        for path in ("/path/parameters/1", "/path/parameters/2", "/no/such/route")
+    ]
+    first, second, unmatched = [
+        middleware._callback_pretty_name(scope) for scope in scopes
+    ]
+    assert first == second == "[GET] /path/parameters/{_path_parameter}"
+    assert unmatched == UNMATCHED_ROUTE_NAME
+
+    with patch(
+        "monitored_ioloop.helpers.fastapi.route_template",
+        side_effect=AssertionError("The cached paths are not matched again."),
+    ):
+        assert middleware._callback_pretty_name(scopes[0]) == first
+        assert middleware._callback_pretty_name(scopes[2]) == UNMATCHED_ROUTE_NAME
+
+
+def test_route_names_cache_is_bounded(fastapi_app: FastAPI) -> None:
+    middleware = MonitoredIOLoopMiddleware(fastapi_app)
+    middleware.MAX_CACHED_NAMES = 2
+    for item_id in range(3):
+        middleware._callback_pretty_name(
+            {
+                "type": "http",
+                "app": fastapi_app,
+                "method": "GET",
+                "path": f"/path/parameters/{item_id}",
+            }
+        )
+    assert [path for _, _, path in middleware._route_names] == [
+        "/path/parameters/1",
+        "/path/parameters/2",
+    ]
@@ -0,0 +1,70 @@
+import types
+import typing
+from pathlib import Path
+
+import pytest
+
+from monitored_ioloop import recorder
+from monitored_ioloop.analyze import analyze_trace, main
+from monitored_ioloop.recorder import LoopEventRecorder
+
+
+@pytest.fixture
+def recording(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    """
+    A recording with two 10 second windows, written in chunks of 4 records per file:
+    "slow" blocks the loop right before every spike of loop lag.
+    """
+    now = [1_000_000.0]
+    monkeypatch.setattr(recorder, "time", types.SimpleNamespace(time=lambda: now[0]))
+
+    events: typing.List[typing.Tuple[float, str, float, float]] = [
+        (1_000_001, "fast", 0.001, 0.0),
+        (1_000_002, "slow", 0.5, 0.0),
+        (1_000_003, "fast", 0.001, 0.4),
+        (1_000_004, "fast", 0.001, 0.0),
+        (1_000_011, "fast", 0.001, 0.01),
+        (1_000_012, "slow", 0.3, 0.0),
+        (1_000_013, "other", 0.002, 0.2),
+    ]
+    with LoopEventRecorder(str(tmp_path), records_per_file=4) as event_recorder:
+        for finished_at, name, wall_time, loop_lag in events:
+            now[0] = finished_at
+            event_recorder.record(name, wall_time, loop_lag, 0)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("chunk_size", [2, 1_000])
+def test_analyze_trace(recording: str, chunk_size: int) -> None:
+    analysis = analyze_trace(
+        recording, window=10, lag_threshold=0.1, preceding=1, chunk_size=chunk_size
+    )
+
+    assert (analysis.events_count, analysis.spikes_count) == (7, 2)
+    assert [
+        (callback.name, callback.count, callback.max_wall_time)
+        for callback in analysis.callbacks
+    ] == [("slow", 2, 0.5), ("fast", 4, 0.001), ("other", 1, 0.002)]
+    assert analysis.callbacks[0].total_wall_time == pytest.approx(0.8)
+
+    assert [
+        (window.started_at, window.count, window.max_loop_lag)
+        for window in analysis.lag_windows
+    ] == [(1_000_000, 4, 0.4), (1_000_010, 3, 0.2)]
+    assert analysis.lag_windows[1].p50_loop_lag == 0.01
+
+    assert [(culprit.name, culprit.spikes) for culprit in analysis.spike_culprits] == [
+        ("slow", 2)
+    ]
+    assert analysis.spike_culprits[0].wall_time == pytest.approx(0.8)
+
+
+def test_main_prints_the_summary(
+    recording: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    main([recording, "--window", "10", "--top", "1"])
+
+    output = capsys.readouterr().out
+    assert "Events: 7, loop lag spikes: 2" in output
+    assert "Top 1 callbacks by total wall time:" in output
+    assert "Top 1 callbacks preceding loop lag spikes:" in output
@@ -1,12 +1,26 @@
 import asyncio
+import selectors
 import time
 import typing
 from typing import assert_never
+from unittest.mock import Mock, patch
 
 import pytest
 
-from tests.conftest import TestCaseContext, InterfaceType
+from monitored_ioloop.monitored_asyncio import (
+    MonitoredSelectorEventLoop,
+    monitored_asyncio_loop_factory,
+)
+from monitored_ioloop.monitoring import (
+    IoLoopMonitorState,
+    IoLoopTickState,
+    LoopMetricsCollector,
+    TaskMonitorState,
+)
+from tests.conftest import TestCaseContext, InterfaceType, LoopType, create_loop_factory
 from tests.utils import (
+    BLOCK_THRESHOLD,
+    FakeClock,
     busy_wait,
     _assert_monitor_result,
     _check_monitor_result,
@@ -17,6 +31,12 @@ async def blocking_coroutine(block_for: float) -> None:
     busy_wait(block_for)
 
 
+async def fake_clock_blocking_coroutine(
+    clock: FakeClock, block_for: float, cpu_bound: bool = True
+) -> None:
+    clock.block(block_for, cpu_bound)
+
+
 async def coroutine_with_result() -> int:
     await asyncio.sleep(0.1)
     return 10
@@ -37,6 +57,60 @@ async def non_cpu_intensive_blocking_coroutine(block_time: float) -> None:
     time.sleep(block_time)
 
 
+async def coroutine_with_thread_safe_callbacks(callbacks_count: int) -> None:
+    loop = asyncio.get_running_loop()
+    done = asyncio.Event()
+
+    def schedule_from_thread() -> None:
+        for _ in range(callbacks_count - 1):
+            loop.call_soon_threadsafe(lambda: None)
+        loop.call_soon_threadsafe(done.set)
+
+    await loop.run_in_executor(None, schedule_from_thread)
+    await done.wait()
+
+
+async def several_fast_callbacks_and_a_blocking_one(callbacks_count: int) -> None:
+    loop = asyncio.get_running_loop()
+    for _ in range(callbacks_count):
+        loop.call_soon(lambda: None)
+    await asyncio.sleep(0)
+    busy_wait(0.3)
+
+
+async def executor_result_while_blocked(block_for: float) -> None:
+    loop = asyncio.get_running_loop()
+    executor_future = loop.run_in_executor(None, lambda: None)
+    busy_wait(block_for)
+    await executor_future
+
+
+async def late_timer_coroutine(sleep_for: float, block_for: float) -> None:
+    sleeping_task = asyncio.create_task(asyncio.sleep(sleep_for))
+    await asyncio.sleep(0)
+    busy_wait(block_for)
+    await sleeping_task
+
+
+async def repeatedly_blocking_coroutine(
+    clock: FakeClock, times: int, block_for: float
+) -> None:
+    for _ in range(times):
+        clock.block(block_for)
+        await asyncio.sleep(0)
+
+
+async def repeatedly_blocking_named_tasks(clock: FakeClock) -> None:
+    await asyncio.gather(
+        asyncio.create_task(
+            repeatedly_blocking_coroutine(clock, 10, 0.01), name="first"
+        ),
+        asyncio.create_task(
+            repeatedly_blocking_coroutine(clock, 5, 0.01), name="second"
+        ),
+    )
+
+
 async def exception_raising_coroutine() -> None:
     raise ValueError("This coroutine raises an exception.")
 
@@ -120,8 +194,11 @@ class TestMonitoredIOLoop:
         mock = test_case_context.mock
         block_for = 0.5
         run_coroutine(test_case_context, complex_blocking_coroutine(block_for))
-        (first_blocking_section,) = mock.mock_calls[0].args
-        (second_blocking_section,) = mock.mock_calls[1].args
+        non_timer_calls = [
+            call for call in mock.mock_calls if call.args[0].timer_lateness is None
+        ]
+        (first_blocking_section,) = non_timer_calls[0].args
+        (second_blocking_section,) = non_timer_calls[1].args
         _assert_monitor_result(block_for, first_blocking_section.callback_wall_time)
         _assert_monitor_result(block_for, second_blocking_section.callback_wall_time)
 
@@ -177,6 +254,65 @@ class TestMonitoredIOLoop:
             mock.mock_calls[-1].args[0].loop_handles_count == 0
         ), "Handles count should drop to 0."
 
+    def test_handles_count_with_thread_safe_callbacks(
+        self,
+        test_case_context: TestCaseContext,
+    ) -> None:
+        mock = test_case_context.mock
+        run_coroutine(test_case_context, coroutine_with_thread_safe_callbacks(10))
+        assert all(
+            call.args[0].loop_handles_count >= 0 for call in mock.mock_calls
+        ), "Handles count should never drop below 0."
+        assert (
+            mock.mock_calls[-1].args[0].loop_handles_count == 0
+        ), "Handles count should drop to 0."
+
+    def test_cross_thread_latency(
+        self,
+        test_case_context: TestCaseContext,
+    ) -> None:
+        mock = test_case_context.mock
+        run_coroutine(test_case_context, executor_result_while_blocked(block_for=0.3))
+        cross_thread_states = [
+            call.args[0]
+            for call in mock.mock_calls
+            if call.args[0].cross_thread_latency is not None
+        ]
+        assert any(
+            typing.cast(float, state.cross_thread_latency) > 0.3 * (1 - BLOCK_THRESHOLD)
+            for state in cross_thread_states
+        ), [state.cross_thread_latency for state in cross_thread_states]
+        assert all(
+            call.args[0].cross_thread_latency is None
+            for call in mock.mock_calls
+            if "executor_result_while_blocked" in call.args[0].callback_pretty_name
+        ), "Callbacks scheduled from the loop thread are not cross thread."
+
+    def test_timer_lateness(
+        self,
+        test_case_context: TestCaseContext,
+    ) -> None:
+        mock = test_case_context.mock
+        run_coroutine(
+            test_case_context, late_timer_coroutine(sleep_for=0.1, block_for=0.3)
+        )
+        timer_states = [
+            call.args[0]
+            for call in mock.mock_calls
+            if call.args[0].timer_lateness is not None
+        ]
+        # The timer was due while the loop was blocked, uvloop may run it even later
+        # since libuv polls with its cached time after a blocking callback.
+        assert any(
+            typing.cast(float, state.timer_lateness) > 0.2 * (1 - BLOCK_THRESHOLD)
+            for state in timer_states
+        ), [state.timer_lateness for state in timer_states]
+        for state in timer_states:
+            assert state.loop_lag == state.timer_lateness
+        assert (
+            mock.mock_calls[-1].args[0].loop_handles_count == 0
+        ), "Timers should not leave handles behind."
+
     def test_loop_lag(
         self,
         test_case_context: TestCaseContext,
@@ -273,3 +409,297 @@ class TestMonitoredIOLoop:
             )
             == 1
         )
+
+    def test_callback_pretty_name__resolved_only_when_read(
+        self,
+        test_case_context: TestCaseContext,
+    ) -> None:
+        mock = test_case_context.mock
+        with (
+            patch("monitored_ioloop.monitoring.pretty_format_handle") as format_handle,
+            patch("monitored_ioloop.monitoring.pretty_callback_name") as callback_name,
+        ):
+            run_coroutine(test_case_context, non_cpu_intensive_blocking_coroutine(0.1))
+            format_handle.assert_not_called()
+            callback_name.assert_not_called()
+            callback_name.return_value = "callback_name"
+            format_handle.return_value = "callback_name"
+            assert mock.mock_calls[0].args[0].callback_pretty_name == "callback_name"
+
+
+class TestMonitoringThresholds:
+    def test_slow_callback_threshold_filters_fast_callbacks(
+        self,
+        loop_type: LoopType,
+    ) -> None:
+        mock = Mock()
+        factory = create_loop_factory(loop_type, mock, slow_callback_threshold=0.2)
+        asyncio.run(complex_blocking_coroutine(0.3), loop_factory=factory)
+        assert len(mock.mock_calls) == 2, "Only the two blocking sections are slow."
+        for call in mock.mock_calls:
+            _assert_monitor_result(0.3, call.args[0].callback_wall_time)
+
+    def test_loop_lag_threshold_reports_lagging_callbacks(
+        self,
+        loop_type: LoopType,
+    ) -> None:
+        mock = Mock()
+        factory = create_loop_factory(
+            loop_type, mock, slow_callback_threshold=1, loop_lag_threshold=0.1
+        )
+        asyncio.run(
+            multiple_coroutines_partly_blocking(blocking_count=1, non_blocking_count=4),
+            loop_factory=factory,
+        )
+        assert mock.mock_calls, "Callbacks queued behind the blocking one should lag."
+        assert all(call.args[0].loop_lag >= 0.1 for call in mock.mock_calls)
+
+    def test_sample_rate_reports_one_in_n_fast_callbacks(
+        self,
+        loop_type: LoopType,
+    ) -> None:
+        mock = Mock()
+        factory = create_loop_factory(
+            loop_type, mock, slow_callback_threshold=0.2, sample_rate=5
+        )
+        asyncio.run(
+            several_fast_callbacks_and_a_blocking_one(callbacks_count=100),
+            loop_factory=factory,
+        )
+        slow_states = [
+            call.args[0]
+            for call in mock.mock_calls
+            if call.args[0].callback_wall_time >= 0.2
+        ]
+        sampled_states = [
+            call.args[0]
+            for call in mock.mock_calls
+            if call.args[0].callback_wall_time < 0.2
+        ]
+        assert len(slow_states) == 1
+        assert slow_states[0].sample_rate == 1
+        assert sampled_states
+        assert all(state.sample_rate == 5 for state in sampled_states)
+        # The loop runs a few more callbacks of its own (task steps, shutdown).
+        estimated_callbacks_count = len(slow_states) + 5 * len(sampled_states)
+        assert 100 <= estimated_callbacks_count <= 130
+
+    def test_sample_rate_must_be_positive(self, loop_type: LoopType) -> None:
+        with pytest.raises(ValueError):
+            create_loop_factory(loop_type, Mock(), sample_rate=0)()
+
+
+class TestCallbackCpuTime:
+    def test_cpu_time_of_cpu_bound_and_sleeping_callbacks(
+        self,
+        loop_type: LoopType,
+        fake_clock: FakeClock,
+    ) -> None:
+        mock = Mock()
+        factory = create_loop_factory(
+            loop_type, mock, slow_callback_threshold=0.1, measure_cpu_time=True
+        )
+        asyncio.run(
+            fake_clock_blocking_coroutine(fake_clock, 0.2), loop_factory=factory
+        )
+        asyncio.run(
+            fake_clock_blocking_coroutine(fake_clock, 0.2, cpu_bound=False),
+            loop_factory=factory,
+        )
+
+        cpu_bound_state, sleeping_state = [call.args[0] for call in mock.mock_calls]
+        assert cpu_bound_state.callback_wall_time == pytest.approx(0.2)
+        assert cpu_bound_state.callback_cpu_time == pytest.approx(0.2)
+        assert sleeping_state.callback_wall_time == pytest.approx(0.2)
+        assert sleeping_state.callback_cpu_time == 0
+
+    def test_cpu_time_is_not_measured_by_default(
+        self,
+        loop_type: LoopType,
+    ) -> None:
+        mock = Mock()
+        asyncio.run(
+            blocking_coroutine(0.01), loop_factory=create_loop_factory(loop_type, mock)
+        )
+        assert all(call.args[0].callback_cpu_time is None for call in mock.mock_calls)
+
+
+class TestTaskMonitoring:
+    def test_task_totals_are_delivered_once_the_task_is_done(
+        self,
+        loop_type: LoopType,
+        fake_clock: FakeClock,
+    ) -> None:
+        task_states: typing.List[TaskMonitorState] = []
+        factory = create_loop_factory(
+            loop_type, None, task_monitor_callback=task_states.append
+        )
+        asyncio.run(
+            repeatedly_blocking_coroutine(fake_clock, 10, 0.02), loop_factory=factory
+        )
+
+        (task_state,) = [
+            task_state
+            for task_state in task_states
+            if task_state.task_name == "repeatedly_blocking_coroutine"
+        ]
+        assert task_state.task.done()
+        assert task_state.steps == 11, "Ten blocking steps and the one returning."
+        assert task_state.total_wall_time == pytest.approx(0.2)
+        assert task_state.max_step_wall_time == pytest.approx(0.02)
+        assert task_state.total_loop_lag == 0, "Nothing else ran in between."
+
+    def test_every_task_is_accounted_separately(
+        self,
+        loop_type: LoopType,
+        fake_clock: FakeClock,
+    ) -> None:
+        task_states: typing.List[TaskMonitorState] = []
+        factory = create_loop_factory(
+            loop_type,
+            None,
+            slow_callback_threshold=10,
+            task_monitor_callback=task_states.append,
+        )
+        asyncio.run(repeatedly_blocking_named_tasks(fake_clock), loop_factory=factory)
+
+        by_name = {task_state.task_name: task_state for task_state in task_states}
+        assert {"first", "second", "repeatedly_blocking_named_tasks"} <= by_name.keys()
+        assert by_name["first"].total_wall_time == pytest.approx(0.1)
+        assert by_name["second"].total_wall_time == pytest.approx(0.05)
+        assert by_name["second"].steps == 6
+        # The tasks alternate, every step of the first task but its first one waits for a step of the second.
+        assert by_name["first"].total_loop_lag == pytest.approx(0.05)
+
+    def test_task_monitor_callback_is_not_in_the_step_cpu_time(
+        self,
+        loop_type: LoopType,
+        fake_clock: FakeClock,
+    ) -> None:
+        mock = Mock()
+        factory = create_loop_factory(
+            loop_type,
+            mock,
+            measure_cpu_time=True,
+            task_monitor_callback=lambda task_state: fake_clock.block(0.1),
+        )
+        asyncio.run(
+            fake_clock_blocking_coroutine(fake_clock, 0.01), loop_factory=factory
+        )
+
+        (step_state,) = [
+            call.args[0]
+            for call in mock.mock_calls
+            if "fake_clock_blocking_coroutine" in call.args[0].callback_name
+        ]
+        assert step_state.callback_wall_time == pytest.approx(0.01)
+        assert step_state.callback_cpu_time == pytest.approx(0.01)
+
+
+class TestLoopMetricsCollector:
+    def test_collector_aggregates_callbacks_by_name(
+        self,
+        loop_type: LoopType,
+    ) -> None:
+        collector = LoopMetricsCollector()
+        factory = create_loop_factory(loop_type, None, metrics_collector=collector)
+        asyncio.run(complex_blocking_coroutine(0.2), loop_factory=factory)
+
+        snapshot = collector.snapshot(reset=True)
+        wall_times = snapshot.histograms[LoopMetricsCollector.CALLBACK_WALL_TIME]
+        histogram = wall_times["complex_blocking_coroutine"]
+        assert histogram.count == 2, "The coroutine runs in two steps."
+        _assert_monitor_result(0.2, histogram.max)
+        assert LoopMetricsCollector.LOOP_LAG in snapshot.histograms
+        assert snapshot.started_at <= snapshot.taken_at
+        assert collector.snapshot().histograms == {}, "The snapshot resets the data."
+
+    def test_collector_ignores_thresholds(
+        self,
+        loop_type: LoopType,
+    ) -> None:
+        mock = Mock()
+        collector = LoopMetricsCollector()
+        factory = create_loop_factory(
+            loop_type, mock, slow_callback_threshold=10, metrics_collector=collector
+        )
+        asyncio.run(coroutine_with_result(), loop_factory=factory)
+        assert not mock.mock_calls
+        assert collector.snapshot().histograms[LoopMetricsCollector.CALLBACK_WALL_TIME]
+
+    def test_collector_records_cross_thread_latency(
+        self,
+        loop_type: LoopType,
+    ) -> None:
+        collector = LoopMetricsCollector()
+        factory = create_loop_factory(loop_type, None, metrics_collector=collector)
+        asyncio.run(executor_result_while_blocked(block_for=0.1), loop_factory=factory)
+
+        histograms = collector.snapshot().histograms
+        cross_thread_latencies = histograms[LoopMetricsCollector.CROSS_THREAD_LATENCY]
+        assert max(
+            histogram.max for histogram in cross_thread_latencies.values()
+        ) > 0.1 * (1 - BLOCK_THRESHOLD)
+
+
+class TestTickMonitoring:
+    def test_tick_poll_time_and_busy_time(self) -> None:
+        tick_states: typing.List[IoLoopTickState] = []
+        factory = monitored_asyncio_loop_factory(
+            None, tick_monitor_callback=tick_states.append
+        )
+        asyncio.run(complex_blocking_coroutine(0.2), loop_factory=factory)
+
+        _assert_monitor_result(
+            1, max(tick_state.poll_time for tick_state in tick_states)
+        )
+        _assert_monitor_result(
+            0.2, max(tick_state.busy_time for tick_state in tick_states)
+        )
+        assert all(
+            tick_state.tick_duration >= tick_state.poll_time
+            for tick_state in tick_states
+        )
+
+    def test_tick_callbacks_run_and_ready_count(self) -> None:
+        tick_states: typing.List[IoLoopTickState] = []
+        factory = monitored_asyncio_loop_factory(
+            None, tick_monitor_callback=tick_states.append
+        )
+        asyncio.run(
+            several_fast_callbacks_and_a_blocking_one(100), loop_factory=factory
+        )
+
+        assert max(tick_state.callbacks_run for tick_state in tick_states) >= 100
+        assert max(tick_state.ready_count for tick_state in tick_states) >= 100
+
+    def test_ticks_are_aggregated_into_the_collector(self) -> None:
+        collector = LoopMetricsCollector()
+        factory = monitored_asyncio_loop_factory(None, metrics_collector=collector)
+        asyncio.run(coroutine_with_result(), loop_factory=factory)
+
+        histograms = collector.snapshot().histograms
+        poll_times = histograms[LoopMetricsCollector.TICK_POLL_TIME]
+        _assert_monitor_result(0.1, poll_times[LoopMetricsCollector.LOOP_NAME].max)
+        assert histograms[LoopMetricsCollector.TICK_DURATION]
+        assert histograms[LoopMetricsCollector.TICK_CALLBACKS_RUN]
+
+    def test_tick_monitor_callback_failure_does_not_stop_the_loop(self) -> None:
+        factory = monitored_asyncio_loop_factory(
+            None, tick_monitor_callback=Mock(side_effect=RuntimeError)
+        )
+        assert asyncio.run(coroutine_with_result(), loop_factory=factory) == 10
+
+
+def test_loop_keyword_arguments_are_passed_to_the_selector_event_loop() -> None:
+    states: typing.List[IoLoopMonitorState] = []
+    selector = selectors.SelectSelector()
+    loop = MonitoredSelectorEventLoop(
+        states.append, selector=selector, slow_callback_threshold=0
+    )
+    try:
+        assert loop._timed_selector._selector is selector
+        assert loop.run_until_complete(coroutine_with_result()) == 10
+    finally:
+        loop.close()
+    assert states
@@ -0,0 +1,55 @@
+import asyncio
+
+from monitored_ioloop.attribution import (
+    LoopCostTable,
+    cost_label,
+    current_cost_label,
+)
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import _assert_monitor_result, busy_wait
+
+
+async def blocking_child(block_for: float) -> None:
+    busy_wait(block_for)
+    await asyncio.sleep(0)
+    busy_wait(block_for)
+
+
+async def labeled_requests() -> None:
+    with cost_label("expensive"):
+        await asyncio.gather(blocking_child(0.05), blocking_child(0.05))
+    with cost_label("cheap"):
+        await blocking_child(0.01)
+    busy_wait(0.05)
+
+
+def test_cost_is_charged_to_the_label_of_the_context(loop_type: LoopType) -> None:
+    cost_table = LoopCostTable()
+    factory = create_loop_factory(loop_type, None, cost_table=cost_table)
+    asyncio.run(labeled_requests(), loop_factory=factory)
+
+    expensive, cheap = cost_table.rows()
+    assert expensive.label == "expensive"
+    _assert_monitor_result(0.2, expensive.total_wall_time)
+    _assert_monitor_result(0.05, expensive.p99_step_wall_time, threshold=0.5)
+    assert expensive.p99_loop_lag > 0.05 * (
+        1 - 0.1
+    ), "The children wait for each other."
+    assert cheap.label == "cheap"
+    _assert_monitor_result(0.02, cheap.total_wall_time, threshold=0.5)
+
+
+def test_rows_reset(loop_type: LoopType) -> None:
+    cost_table = LoopCostTable()
+    factory = create_loop_factory(loop_type, None, cost_table=cost_table)
+    asyncio.run(labeled_requests(), loop_factory=factory)
+
+    assert cost_table.rows(reset=True)
+    assert cost_table.rows() == []
+
+
+def test_cost_label_is_reset_after_the_block() -> None:
+    assert current_cost_label() is None
+    with cost_label("label"):
+        assert current_cost_label() == "label"
+    assert current_cost_label() is None
@@ -0,0 +1,120 @@
+import asyncio
+import gc
+import threading
+import time
+import typing
+import weakref
+from unittest.mock import patch
+
+import pytest
+
+from monitored_ioloop.batching import BatchedMonitorCallback
+from monitored_ioloop.monitoring import IoLoopMonitorState, MonitoredCallbackWrapper
+from tests.conftest import LoopType, create_loop_factory
+
+
+def _monitor_state(wall_time: float) -> IoLoopMonitorState:
+    return IoLoopMonitorState(
+        callback_wall_time=wall_time,
+        loop_handles_count=0,
+        loop_lag=0,
+        callback_pretty_name="callback",
+    )
+
+
+def test_batches_are_delivered_in_order() -> None:
+    batches: typing.List[typing.Sequence[IoLoopMonitorState]] = []
+    with BatchedMonitorCallback(batches.append, capacity=16) as batched_callback:
+        for wall_time in range(40):
+            batched_callback(_monitor_state(wall_time))
+            if wall_time % 10 == 9:
+                time.sleep(0.2)
+
+    delivered = [state.callback_wall_time for batch in batches for state in batch]
+    assert delivered == list(range(40))
+    assert batched_callback.dropped_count == 0
+
+
+def test_events_are_dropped_when_the_buffer_is_full() -> None:
+    batches: typing.List[typing.Sequence[IoLoopMonitorState]] = []
+    batched_callback = BatchedMonitorCallback(
+        batches.append, capacity=4, flush_interval=60
+    )
+    for wall_time in range(10):
+        batched_callback(_monitor_state(wall_time))
+    batched_callback.close()
+
+    assert [state.callback_wall_time for state in batches[0]] == [0, 1, 2, 3]
+    assert batched_callback.dropped_count == 6
+
+
+def test_batch_callback_runs_outside_the_loop_thread(loop_type: LoopType) -> None:
+    loop_thread_id = threading.get_ident()
+    batch_threads: typing.Set[int] = set()
+
+    def batch_callback(batch: typing.Sequence[IoLoopMonitorState]) -> None:
+        batch_threads.add(threading.get_ident())
+
+    with BatchedMonitorCallback(batch_callback) as batched_callback:
+        factory = create_loop_factory(loop_type, batched_callback)
+        asyncio.run(asyncio.sleep(0.1), loop_factory=factory)
+
+    assert batch_threads
+    assert loop_thread_id not in batch_threads
+
+
+@pytest.mark.parametrize("resolve_pretty_names", [True, False])
+def test_pretty_names_are_resolved_on_the_loop_thread(
+    loop_type: LoopType, resolve_pretty_names: bool
+) -> None:
+    states: typing.List[IoLoopMonitorState] = []
+    resolved_on: typing.Set[int] = set()
+
+    def resolve_pretty_name(_wrapper: MonitoredCallbackWrapper) -> str:
+        resolved_on.add(threading.get_ident())
+        return "pretty name"
+
+    def batch_callback(batch: typing.Sequence[IoLoopMonitorState]) -> None:
+        states.extend(batch)
+
+    with BatchedMonitorCallback(
+        batch_callback, resolve_pretty_names=resolve_pretty_names
+    ) as batched_callback:
+        factory = create_loop_factory(loop_type, batched_callback)
+        with patch.object(
+            MonitoredCallbackWrapper, "_resolve_pretty_name", resolve_pretty_name
+        ):
+            asyncio.run(asyncio.sleep(0.1), loop_factory=factory)
+
+    assert states
+    if resolve_pretty_names:
+        assert resolved_on == {threading.get_ident()}
+    else:
+        assert not resolved_on
+        assert all(
+            state.callback_pretty_name == state.callback_name for state in states
+        )
+
+
+@pytest.mark.parametrize("resolve_pretty_names", [True, False])
+def test_buffered_states_do_not_keep_the_tasks_alive(
+    loop_type: LoopType, resolve_pretty_names: bool
+) -> None:
+    states: typing.List[IoLoopMonitorState] = []
+    task_refs: typing.List["weakref.ref[asyncio.Task[None]]"] = []
+
+    async def main() -> None:
+        task = asyncio.create_task(asyncio.sleep(0))
+        task_refs.append(weakref.ref(task))
+        await task
+
+    with BatchedMonitorCallback(
+        states.extend, resolve_pretty_names=resolve_pretty_names
+    ) as batched_callback:
+        asyncio.run(
+            main(), loop_factory=create_loop_factory(loop_type, batched_callback)
+        )
+
+    assert states
+    gc.collect()
+    assert task_refs[0]() is None
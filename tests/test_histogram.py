@@ -0,0 +1,55 @@
+import pytest
+
+from monitored_ioloop.histogram import LogLinearHistogram
+
+
+def test_percentile_relative_error_is_bounded() -> None:
+    histogram = LogLinearHistogram(sub_buckets=8)
+    values = [i / 1000 for i in range(1, 1001)]
+    for value in values:
+        histogram.record(value)
+
+    assert histogram.count == len(values)
+    assert histogram.sum == pytest.approx(sum(values))
+    for quantile in (0.5, 0.9, 0.99):
+        expected = values[int(quantile * len(values)) - 1]
+        assert expected <= histogram.percentile(quantile) <= expected * (1 + 1 / 8)
+
+
+def test_percentile_is_clamped_to_min_and_max() -> None:
+    histogram = LogLinearHistogram()
+    histogram.record(0.3)
+    assert histogram.percentile(0) == 0.3
+    assert histogram.percentile(1) == 0.3
+
+
+def test_zero_values_are_counted() -> None:
+    histogram = LogLinearHistogram()
+    histogram.record(0)
+    histogram.record(1)
+    assert histogram.buckets()[0] == (0.0, 1)
+    assert histogram.percentile(0.5) == 0
+
+
+def test_merge() -> None:
+    first, second = LogLinearHistogram(), LogLinearHistogram()
+    first.record(0.001)
+    second.record(1)
+    second.record(2)
+    first.merge(second)
+    assert first.count == 3
+    assert first.min == 0.001
+    assert first.max == 2
+    assert sum(count for _, count in first.buckets()) == 3
+
+
+def test_merge_with_different_sub_buckets_fails() -> None:
+    with pytest.raises(ValueError):
+        LogLinearHistogram(sub_buckets=4).merge(LogLinearHistogram(sub_buckets=8))
+
+
+def test_cumulative_counts() -> None:
+    histogram = LogLinearHistogram()
+    for value in (0, 0.001, 0.002, 0.5):
+        histogram.record(value)
+    assert histogram.cumulative_counts([0.0, 0.0015, 0.01, 1]) == [1, 2, 3, 4]
@@ -0,0 +1,66 @@
+import dataclasses
+import functools
+import inspect
+from unittest.mock import Mock
+
+import pytest
+
+from monitored_ioloop.monitoring import (
+    IoLoopInnerState,
+    IoLoopMonitorState,
+    wrap_callback_with_monitoring,
+)
+
+
+def _callback(value: int) -> int:
+    return value * 2
+
+
+def test_wrapper_calls_the_callback_and_reports() -> None:
+    monitor_callback = Mock()
+    state = IoLoopInnerState(handles_count=0)
+    wrapper = wrap_callback_with_monitoring(_callback, monitor_callback, state)
+    assert state.handles_count == 1
+
+    assert wrapper(21) == 42
+    assert state.handles_count == 0
+    (monitor_state,) = monitor_callback.call_args.args
+    assert monitor_state.callback_pretty_name == "_callback"
+
+
+def test_monitor_state_pretty_name_is_a_field() -> None:
+    monitor_state = IoLoopMonitorState(
+        callback_wall_time=1,
+        callback_pretty_name="name",
+        loop_handles_count=0,
+        loop_lag=0,
+    )
+    assert dataclasses.asdict(monitor_state)["callback_pretty_name"] == "name"
+
+    resolver = Mock(return_value="lazy name")
+    monitor_state.resolve_callback_pretty_name_lazily(resolver)
+    resolver.assert_not_called()
+    assert dataclasses.asdict(monitor_state)["callback_pretty_name"] == "lazy name"
+    assert monitor_state == dataclasses.replace(monitor_state)
+    resolver.assert_called_once()
+    with pytest.raises(AttributeError):
+        getattr(monitor_state, "missing")
+
+
+def test_wrapper_looks_like_the_callback() -> None:
+    partial_callback = functools.partial(_callback, 1)
+    wrapper = wrap_callback_with_monitoring(
+        partial_callback, None, IoLoopInnerState(handles_count=0)
+    )
+    assert isinstance(wrapper, functools.partial)
+    assert wrapper.func is _callback
+    assert inspect.unwrap(wrapper) is partial_callback
+    assert repr(wrapper) == repr(partial_callback)
+
+
+def test_wrapper_is_slotted() -> None:
+    wrapper = wrap_callback_with_monitoring(
+        _callback, None, IoLoopInnerState(handles_count=0)
+    )
+    with pytest.raises(AttributeError):
+        wrapper.unknown_attribute = 1  # type: ignore[attr-defined]
@@ -0,0 +1,67 @@
+import asyncio
+import typing
+
+import pytest
+import uvloop
+
+from monitored_ioloop.monitoring import LoopMetricsCollector
+from monitored_ioloop.probe import LoopLagProbe
+from tests.utils import busy_wait
+
+
+async def probe_blocked_loop(probe: LoopLagProbe, block_for: float) -> None:
+    probe.start()
+    await asyncio.sleep(0.1)
+    busy_wait(block_for)
+    await asyncio.sleep(0.1)
+    probe.stop()
+
+
+@pytest.fixture(
+    params=[asyncio.new_event_loop, uvloop.new_event_loop], ids=["asyncio", "uvloop"]
+)
+def plain_loop_factory(
+    request: pytest.FixtureRequest,
+) -> typing.Callable[[], asyncio.AbstractEventLoop]:
+    return typing.cast(typing.Callable[[], asyncio.AbstractEventLoop], request.param)
+
+
+def test_probe_measures_blocking_on_plain_loops(
+    plain_loop_factory: typing.Callable[[], asyncio.AbstractEventLoop],
+) -> None:
+    probe = LoopLagProbe(interval=0.02)
+    asyncio.run(probe_blocked_loop(probe, 0.3), loop_factory=plain_loop_factory)
+
+    # The blocking started somewhere within an interval after the last probe was scheduled.
+    assert 0.3 - 0.02 - 0.01 < probe.histogram.max < 0.3 + 0.03
+    assert probe.histogram.percentile(0.5) < 0.01, "Most probes ran on time."
+
+
+def test_probe_records_into_the_collector(
+    plain_loop_factory: typing.Callable[[], asyncio.AbstractEventLoop],
+) -> None:
+    collector = LoopMetricsCollector()
+    probe = LoopLagProbe(interval=0.02, metrics_collector=collector)
+    asyncio.run(probe_blocked_loop(probe, 0.1), loop_factory=plain_loop_factory)
+
+    histogram = collector.snapshot().histograms[LoopMetricsCollector.PROBE_LAG][
+        LoopMetricsCollector.LOOP_NAME
+    ]
+    assert histogram.count == probe.histogram.count > 1
+
+
+def test_stopped_probe_is_not_scheduled() -> None:
+    async def start_and_stop(probe: LoopLagProbe) -> None:
+        probe.start()
+        probe.stop()
+        await asyncio.sleep(0.1)
+
+    probe = LoopLagProbe(interval=0.01)
+    asyncio.run(start_and_stop(probe))
+    assert probe.last_lag is None
+    assert probe.histogram.count == 0
+
+
+def test_interval_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        LoopLagProbe(interval=0)
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+import pytest
+
+from monitored_ioloop.profiler import StallProfiler
+from monitored_ioloop.watchdog import LoopStall, LoopWatchdog
+from tests.conftest import LoopType, create_loop_factory
+
+
+def _stall(name: str, stack: str) -> LoopStall:
+    return LoopStall(
+        stalled_for=1,
+        stack=stack,
+        thread_id=1,
+        callback_pretty_name=f"<Task pending name='Task-1' coro=<{name}() running>>",
+        callback_name=name,
+    )
+
+
+def _sample_while_blocked(watchdog: LoopWatchdog, samples: int) -> None:
+    """
+    Block the loop thread while another thread takes the watchdog's samples,
+    so the amount of samples doesn't depend on how the watchdog thread is scheduled.
+    """
+
+    def sample() -> None:
+        for _ in range(samples):
+            watchdog._sample()
+
+    sampling_thread = threading.Thread(target=sample)
+    sampling_thread.start()
+    sampling_thread.join()
+
+
+async def profiled_coroutine(watchdog: LoopWatchdog, samples: int) -> None:
+    _sample_while_blocked(watchdog, samples)
+
+
+async def profiled_tasks(
+    tasks_count: int, watchdog: LoopWatchdog, samples: int
+) -> None:
+    await asyncio.gather(
+        *(profiled_coroutine(watchdog, samples) for _ in range(tasks_count))
+    )
+
+
+def _profiling_watchdog(profiler: StallProfiler) -> LoopWatchdog:
+    # Every running callback is stalled, and the watchdog thread never samples on its own.
+    return LoopWatchdog(stall_threshold=0, sample_interval=3600, on_stall=profiler)
+
+
+def test_samples_are_counted_per_callback_and_stack() -> None:
+    profiler = StallProfiler()
+    for stack in ("main;a", "main;a", "main;b"):
+        profiler(_stall("first", stack))
+    profiler(_stall("second;with separator", "main;a"))
+
+    assert profiler.snapshot() == {
+        "first": {"main;a": 2, "main;b": 1},
+        "second,with separator": {"main;a": 1},
+    }
+    assert sorted(profiler.collapsed().splitlines()) == [
+        "first;main;a 2",
+        "first;main;b 1",
+        "second,with separator;main;a 1",
+    ]
+
+
+def test_least_sampled_stack_is_evicted() -> None:
+    profiler = StallProfiler(max_stacks=2)
+    for stack in ("a", "a", "b", "c", "c"):
+        profiler(_stall("callback", stack))
+
+    assert profiler.snapshot() == {"callback": {"a": 2, "c": 2}}
+    assert profiler.evicted_samples == 1
+
+
+def test_snapshot_reset() -> None:
+    profiler = StallProfiler()
+    profiler(_stall("callback", "a"))
+    assert profiler.collapsed(reset=True) == "callback;a 1\n"
+    assert profiler.snapshot() == {}
+
+
+def test_max_stacks_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        StallProfiler(max_stacks=0)
+
+
+def test_profiling_a_stalled_loop(loop_type: LoopType) -> None:
+    profiler = StallProfiler()
+    with _profiling_watchdog(profiler) as watchdog:
+        factory = create_loop_factory(loop_type, None, watchdog=watchdog)
+        asyncio.run(profiled_coroutine(watchdog, 10), loop_factory=factory)
+
+    assert list(profiler.snapshot()) == ["profiled_coroutine"]
+    assert sum(profiler.snapshot()["profiled_coroutine"].values()) == 10
+    assert all(
+        "profiled_coroutine (" in line and "_sample_while_blocked (" in line
+        for line in profiler.collapsed().splitlines()
+    )
+
+
+def test_tasks_of_the_same_coroutine_share_a_name(loop_type: LoopType) -> None:
+    profiler = StallProfiler()
+    with _profiling_watchdog(profiler) as watchdog:
+        factory = create_loop_factory(loop_type, None, watchdog=watchdog)
+        asyncio.run(profiled_tasks(3, watchdog, 2), loop_factory=factory)
+
+    assert list(profiler.snapshot()) == ["profiled_coroutine"]
+    assert sum(profiler.snapshot()["profiled_coroutine"].values()) == 6
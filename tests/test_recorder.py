@@ -0,0 +1,152 @@
+import asyncio
+import errno
+import logging
+import os
+import typing
+from pathlib import Path
+
+import numpy
+import pytest
+
+from monitored_ioloop.recorder import (
+    RECORD,
+    LoopEventRecorder,
+    events_files,
+    iter_events,
+    load_events,
+)
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import busy_wait
+
+
+async def blocking_coroutine(block_for: float) -> None:
+    busy_wait(block_for)
+
+
+def test_reported_callbacks_are_recorded(loop_type: LoopType, tmp_path: Path) -> None:
+    with LoopEventRecorder(str(tmp_path)) as recorder:
+        factory = create_loop_factory(
+            loop_type, None, event_recorder=recorder, slow_callback_threshold=0.1
+        )
+        asyncio.run(blocking_coroutine(0.2), loop_factory=factory)
+
+    records, names = load_events(str(tmp_path))
+    assert names == ["blocking_coroutine"]
+    assert len(records) == 1
+    assert records["name_id"][0] == 0
+    assert 0.2 <= records["wall_time"][0] < 0.5
+    assert records["sample_rate"][0] == 1
+    assert records["timestamp"][0] > 0
+
+
+def test_files_are_rotated(tmp_path: Path) -> None:
+    with LoopEventRecorder(str(tmp_path), records_per_file=4, max_files=2) as recorder:
+        for index in range(10):
+            recorder.record(f"callback-{index % 3}", index, 0.0, 0)
+
+    # 3 files were written, the first (oldest) one was deleted.
+    assert [os.path.basename(path) for path in events_files(str(tmp_path))] == [
+        "events-000001.bin",
+        "events-000002.bin",
+    ]
+    records, names = load_events(str(tmp_path))
+    assert list(records["wall_time"]) == [4, 5, 6, 7, 8, 9]
+    assert [names[name_id] for name_id in records["name_id"]] == [
+        "callback-1",
+        "callback-2",
+        "callback-0",
+        "callback-1",
+        "callback-2",
+        "callback-0",
+    ]
+
+
+def test_unwritten_records_are_skipped_while_recording(tmp_path: Path) -> None:
+    recorder = LoopEventRecorder(str(tmp_path), records_per_file=100)
+    for index in range(5):
+        recorder.record("callback", index, 0.0, 0)
+    assert os.path.getsize(events_files(str(tmp_path))[0]) == 100 * RECORD.size
+
+    chunks = list(iter_events(str(tmp_path), chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(numpy.concatenate(chunks)["wall_time"]) == [0, 1, 2, 3, 4]
+    recorder.close()
+    assert os.path.getsize(events_files(str(tmp_path))[0]) == 5 * RECORD.size
+
+
+def test_recording_into_an_existing_directory_keeps_the_name_ids(
+    tmp_path: Path,
+) -> None:
+    with LoopEventRecorder(str(tmp_path)) as recorder:
+        recorder.record("first", 1, 0.0, 0)
+    with LoopEventRecorder(str(tmp_path)) as recorder:
+        recorder.record("second", 2, 0.0, 0)
+        recorder.record("first", 3, 0.0, 0)
+
+    records, names = load_events(str(tmp_path))
+    assert names == ["first", "second"]
+    assert list(records["name_id"]) == [0, 1, 0]
+
+
+def _raise_errno(
+    error_number: int,
+) -> typing.Callable[[int, int, int], None]:
+    def posix_fallocate(_fd: int, _offset: int, _length: int) -> None:
+        raise OSError(error_number, os.strerror(error_number))
+
+    return posix_fallocate
+
+
+@pytest.mark.parametrize("fallocate_supported", [True, False])
+def test_files_are_preallocated(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fallocate_supported: bool
+) -> None:
+    if not fallocate_supported:
+        monkeypatch.setattr(os, "posix_fallocate", _raise_errno(errno.EOPNOTSUPP))
+    with LoopEventRecorder(str(tmp_path), records_per_file=10_000):
+        (events_file,) = events_files(str(tmp_path))
+        # Not a sparse file, the disk blocks are allocated.
+        assert os.stat(events_file).st_blocks * 512 >= 10_000 * RECORD.size
+
+
+def test_full_disk_raises_on_rotation(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with LoopEventRecorder(str(tmp_path), records_per_file=2) as recorder:
+        recorder.record("callback", 0, 0.0, 0)
+        recorder.record("callback", 1, 0.0, 0)
+        with monkeypatch.context() as patched:
+            patched.setattr(os, "posix_fallocate", _raise_errno(errno.ENOSPC))
+            with pytest.raises(OSError):
+                recorder.record("callback", 2, 0.0, 0)
+        assert len(events_files(str(tmp_path))) == 1
+        recorder.record("callback", 3, 0.0, 0)
+
+    records, _ = load_events(str(tmp_path))
+    assert list(records["wall_time"]) == [0, 1, 3]
+
+
+def test_records_after_close_are_dropped(tmp_path: Path) -> None:
+    recorder = LoopEventRecorder(str(tmp_path))
+    recorder.record("callback", 0, 0.0, 0)
+    recorder.close()
+    recorder.record("callback", 1, 0.0, 0)
+
+    records, _ = load_events(str(tmp_path))
+    assert list(records["wall_time"]) == [0]
+
+
+def test_recorder_failures_dont_break_the_loop(
+    loop_type: LoopType,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    recorder = LoopEventRecorder(str(tmp_path), records_per_file=1)
+    monkeypatch.setattr(os, "posix_fallocate", _raise_errno(errno.ENOSPC))
+    factory = create_loop_factory(loop_type, None, event_recorder=recorder)
+    with caplog.at_level(logging.WARNING):
+        assert asyncio.run(asyncio.sleep(0, result=1), loop_factory=factory) == 1
+    recorder.close()
+
+    assert "Event recorder failed." in caplog.messages
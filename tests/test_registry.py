@@ -0,0 +1,98 @@
+import asyncio
+import gc
+import threading
+import time
+import typing
+
+from monitored_ioloop.registry import LoopSnapshot, loop_registry
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import busy_wait
+
+
+def _loop_snapshot(loop_id: typing.Optional[int]) -> typing.Optional[LoopSnapshot]:
+    return next(
+        (
+            loop_snapshot
+            for loop_snapshot in loop_registry.snapshot()
+            if loop_snapshot.loop_id == loop_id
+        ),
+        None,
+    )
+
+
+def test_loops_in_threads_are_registered(loop_type: LoopType) -> None:
+    loop = create_loop_factory(loop_type, None)()
+    loop_id = getattr(loop, "ioloop_state").loop_id
+    loop_snapshot = _loop_snapshot(loop_id)
+    assert loop_snapshot is not None
+    assert (loop_snapshot.thread_name, loop_snapshot.running) == (None, False)
+
+    started = threading.Event()
+    stop = threading.Event()
+
+    async def blocked_loop() -> None:
+        started.set()
+        while not stop.is_set():
+            busy_wait(0.01)
+            await asyncio.sleep(0)
+
+    thread = threading.Thread(
+        target=loop.run_until_complete, args=(blocked_loop(),), name="background-loop"
+    )
+    thread.start()
+    started.wait()
+    busy_wait(0.2)
+    loop_snapshot = _loop_snapshot(loop_id)
+    stop.set()
+    thread.join()
+
+    assert loop_snapshot is not None
+    assert (loop_snapshot.thread_name, loop_snapshot.running) == (
+        "background-loop",
+        True,
+    )
+    assert loop_snapshot.utilization.utilization > 0.5
+
+    loop.close()
+    loop_snapshot = _loop_snapshot(loop_id)
+    assert loop_snapshot is not None
+    assert (loop_snapshot.running, loop_snapshot.closed) == (False, True)
+
+    del loop
+    gc.collect()
+    assert _loop_snapshot(loop_id) is None
+
+
+def test_loops_get_unique_ids() -> None:
+    loops = [create_loop_factory(loop_type, None)() for loop_type in LoopType]
+    loop_ids = [getattr(loop, "ioloop_state").loop_id for loop in loops]
+    assert len(set(loop_ids)) == len(loops)
+    assert set(loop_ids) <= set(loop_registry.loops())
+    for loop in loops:
+        loop.close()
+
+
+def test_a_stalled_callback_shows_up_in_the_loop_lag(loop_type: LoopType) -> None:
+    loop = create_loop_factory(loop_type, None, track_current_callback=True)()
+    loop_id = getattr(loop, "ioloop_state").loop_id
+    stalled = threading.Event()
+
+    async def stalled_loop() -> None:
+        stalled.set()
+        busy_wait(0.5)
+
+    thread = threading.Thread(
+        target=loop.run_until_complete, args=(stalled_loop(),), name="stalled-loop"
+    )
+    thread.start()
+    stalled.wait()
+    time.sleep(0.3)
+    stalled_snapshot = _loop_snapshot(loop_id)
+    thread.join()
+    idle_snapshot = _loop_snapshot(loop_id)
+    loop.close()
+
+    assert stalled_snapshot is not None and idle_snapshot is not None
+    # The stalled callback itself had no lag, it is blocking the loop for as long as it runs.
+    assert 0.3 <= stalled_snapshot.last_loop_lag < 0.5
+    assert idle_snapshot.last_loop_lag < 0.3
@@ -0,0 +1,49 @@
+import asyncio
+import typing
+
+from monitored_ioloop.monitored_asyncio import MonitoredSelectorEventLoop
+from monitored_ioloop.monitored_uvloop import MonitoredUvloopEventLoop
+from monitored_ioloop.utilization import LoopUtilization, utilization_between
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import _assert_monitor_result, busy_wait
+
+MonitoredLoop = typing.Union[MonitoredSelectorEventLoop, MonitoredUvloopEventLoop]
+
+
+async def half_busy_coroutine(
+    block_for: float,
+) -> typing.Tuple[LoopUtilization, LoopUtilization]:
+    loop = typing.cast(MonitoredLoop, asyncio.get_running_loop())
+    earlier = loop.loop_utilization()
+    busy_wait(block_for)
+    await asyncio.sleep(block_for)
+    return earlier, loop.loop_utilization()
+
+
+def test_utilization_between(loop_type: LoopType) -> None:
+    factory = create_loop_factory(loop_type, None)
+    earlier, later = asyncio.run(half_busy_coroutine(0.2), loop_factory=factory)
+
+    _assert_monitor_result(0.2, later.idle_time - earlier.idle_time)
+    _assert_monitor_result(0.2, later.active_time - earlier.active_time)
+    _assert_monitor_result(0.5, utilization_between(earlier, later))
+
+
+def test_utilization_is_not_counted_while_the_loop_is_not_running(
+    loop_type: LoopType,
+) -> None:
+    loop = typing.cast(MonitoredLoop, create_loop_factory(loop_type, None)())
+    try:
+        assert loop.loop_utilization() == LoopUtilization(0, 0)
+        loop.run_until_complete(asyncio.sleep(0.1))
+        after_run = loop.loop_utilization()
+        busy_wait(0.1)
+        assert loop.loop_utilization() == after_run
+        _assert_monitor_result(0.1, after_run.idle_time + after_run.active_time)
+    finally:
+        loop.close()
+
+
+def test_utilization_of_an_idle_loop() -> None:
+    assert LoopUtilization(idle_time=0, active_time=0).utilization == 0
+    assert LoopUtilization(idle_time=3, active_time=1).utilization == 0.25
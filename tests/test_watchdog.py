@@ -0,0 +1,77 @@
+import asyncio
+import sys
+import typing
+from unittest.mock import Mock
+
+from monitored_ioloop.monitoring import IoLoopMonitorState
+from monitored_ioloop.watchdog import LoopStall, LoopWatchdog, collapse_stack
+from tests.conftest import LoopType, create_loop_factory
+from tests.utils import busy_wait
+
+
+async def stalling_coroutine(block_for: float) -> None:
+    busy_wait(block_for)
+
+
+def _reported_states(mock: Mock, name: str) -> typing.List[IoLoopMonitorState]:
+    return [
+        call.args[0]
+        for call in mock.mock_calls
+        if name in call.args[0].callback_pretty_name
+    ]
+
+
+def test_stall_stacks_are_attached_to_the_monitor_state(loop_type: LoopType) -> None:
+    mock = Mock()
+    with LoopWatchdog(stall_threshold=0.1, sample_interval=0.01) as watchdog:
+        factory = create_loop_factory(loop_type, mock, watchdog=watchdog)
+        asyncio.run(stalling_coroutine(0.3), loop_factory=factory)
+
+    (state,) = _reported_states(mock, "stalling_coroutine")
+    assert state.stall_stacks is not None
+    assert 5 < len(state.stall_stacks) <= 20
+    assert all(
+        stack.split(";")[-2].startswith("stalling_coroutine")
+        and stack.split(";")[-1].startswith("busy_wait")
+        for stack in state.stall_stacks
+    ), state.stall_stacks[0]
+
+
+def test_fast_callbacks_have_no_stall_stacks(loop_type: LoopType) -> None:
+    mock = Mock()
+    with LoopWatchdog(stall_threshold=0.1) as watchdog:
+        factory = create_loop_factory(loop_type, mock, watchdog=watchdog)
+        asyncio.run(asyncio.sleep(0.2), loop_factory=factory)
+
+    assert mock.mock_calls
+    assert all(call.args[0].stall_stacks is None for call in mock.mock_calls)
+
+
+def test_on_stall_is_called_while_the_loop_is_stalled(loop_type: LoopType) -> None:
+    mock = Mock()
+    stalls: typing.List[LoopStall] = []
+    with LoopWatchdog(
+        stall_threshold=0.1,
+        sample_interval=0.01,
+        on_stall=stalls.append,
+        max_stacks_per_callback=2,
+    ) as watchdog:
+        factory = create_loop_factory(loop_type, mock, watchdog=watchdog)
+        asyncio.run(stalling_coroutine(0.3), loop_factory=factory)
+
+    (state,) = _reported_states(mock, "stalling_coroutine")
+    assert state.stall_stacks is not None and len(state.stall_stacks) == 2
+    assert len(stalls) > 5, "max_stacks_per_callback doesn't limit on_stall."
+    assert all(stall.stalled_for >= 0.1 for stall in stalls)
+    assert "stalling_coroutine" in stalls[0].callback_pretty_name
+    assert "busy_wait" in stalls[-1].stack
+
+
+def test_collapse_stack() -> None:
+    def inner() -> str:
+        return collapse_stack(sys._getframe())
+
+    frames = inner().split(";")
+    assert frames[-1].startswith("inner (")
+    assert frames[-2].startswith("test_collapse_stack (")
+    assert frames[-1].endswith(f"{__file__}:{inner.__code__.co_firstlineno + 1})")
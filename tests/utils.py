@@ -21,6 +21,28 @@ def busy_wait(seconds_to_wait: float = 1) -> None:
         pass
 
 
+class FakeClock:
+    """
+    Stands in for the monitoring module's clocks (see the fake_clock fixture), the tested coroutines
+    "block" the loop by advancing it, so the measured times don't depend on the machine's load.
+    """
+
+    def __init__(self) -> None:
+        self.wall_time = 1000.0
+        self.cpu_time = 0.0
+
+    def perf_counter(self) -> float:
+        return self.wall_time
+
+    def thread_time(self) -> float:
+        return self.cpu_time
+
+    def block(self, seconds: float, cpu_bound: bool = True) -> None:
+        self.wall_time += seconds
+        if cpu_bound:
+            self.cpu_time += seconds
+
+
 def _assert_monitor_result(
     expected_block: float, monitored_block: float, threshold: float = BLOCK_THRESHOLD
 ) -> None: